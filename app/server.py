@@ -2,7 +2,8 @@
 Server for sylver web application.
 """
 
-from sylver import error, position, solve
+from sylver import anytime, position, solve
+from sylver.backend import CachedBackend
 from sylver.backend.redis import RedisBackend
 
 from flask import (
@@ -11,10 +12,23 @@ from flask import (
     request,
 )
 
-from multiprocessing import Pool, Process, Queue
+import multiprocessing
+
+def make_backend():
+    """Returns the backend: Redis behind an in-process cache."""
+    return CachedBackend(RedisBackend(host="localhost", port=6379))
 
 # Initialise the backend
-backend = RedisBackend(host="localhost", port=6379)
+backend = make_backend()
+
+# Solver processes are spawned rather than forked. A fork from a request
+# thread would copy the cache's lock, possibly held by another thread, and
+# the Redis connection. Each process opens its own backend instead.
+spawn = multiprocessing.get_context("spawn")
+
+# Time spent solving in a request before answering (and leaving the rest to
+# the solver pool)
+SOLVE_SECONDS = 0.2
 
 class Pool():
     """Worker pool for solving unknown positions in the background 
@@ -25,12 +39,8 @@ class Pool():
         self.processes = []
         self.positions = []
     
-    def solve(self, pos):
-        solve.solve(pos, verbose=False, backend=backend, 
-            deep=False, reverse=False)
-    
     def submit(self, pos):
-        if pos.name in self.positions:
+        if pos.key in self.positions:
             print(f"Already submitted position for solving: {pos}")
             return
         print(f"Submitted position for solving: {pos}")
@@ -42,10 +52,15 @@ class Pool():
             self.processes = self.processes[1:]
             self.positions = self.positions[1:]
         # Start a solve process
-        p = Process(target=self.solve, args=(pos,), daemon=True)
+        p = spawn.Process(target=solve_in_process, args=(pos,), daemon=True)
         p.start()
         self.processes.append(p)
-        self.positions.append(pos.name)
+        self.positions.append(pos.key)
+
+def solve_in_process(pos):
+    """Target of the solver processes."""
+    solve.solve(pos, verbose=False, backend=make_backend(), deep=False,
+        reverse=False)
 
 solver_pool = Pool(4)
 
@@ -66,29 +81,33 @@ def get():
         seeds = [int(i) for i in params["input"].split(",")]
         length = int(params["length"]) if params.get("length") else None
         pos = position.Position(seeds, length=length)
-        # Fetch status from backend
-        status = solve.quick(pos) or backend.get_status(pos) or "?"
-        # If unknown status submit to the solver pool
-        if status == "?":
+        # Solve within the time budget (or fetch status from backend)
+        result = anytime.solve(pos, backend=backend, seconds=SOLVE_SECONDS)
+        status = result["status"] or "?"
+        # If out of time submit to the solver pool
+        if result["status"] is None:
             solver_pool.submit(pos)
         # Construct response
         response = {
             **pos.to_dict(),
             "status": status,
+            "replies": result["replies"],
             "bitarray": pos.bitarray.tolist(),
         }
         # Get the status of children
         if params.get("children"):
             children = {}
-            for gap in pos.gaps():
-                try:
-                    child = pos.add(gap)
-                except error.LengthError:
-                    break
-                status = solve.quick(child) or backend.get_status(child) or "?"
+            moves = list(pos.children(skip_invalid=True))
+            statuses = backend.get_statuses([child for _, child in moves])
+            replies, losing = set(result["replies"]), set(result["losing"])
+            for (gap, child), status in zip(moves, statuses):
+                if gap in replies:
+                    status = "P"
+                elif gap in losing:
+                    status = "N"
                 children[str(gap)] = {
                     **child.to_dict(), 
-                    "status": status,
+                    "status": solve.quick(child) or status or "?",
                 }
             response["children"] = children
     except Exception as e:
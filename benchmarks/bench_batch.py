@@ -0,0 +1,36 @@
+"""Benchmark screening a search frontier with `quick()` one position at a
+time against the batched NumPy kernel.
+
+Usage: python benchmarks/bench_batch.py
+"""
+
+from sylver.batch import PositionBatch
+from sylver.position import Position
+from sylver.solve import quick
+
+import time
+
+
+def objects(frontier):
+    return [quick(child) for position in frontier
+        for _, child in position.children()]
+
+def batched(frontier):
+    _, _, batch = PositionBatch(frontier).expand()
+    return batch.quick()
+
+def main():
+    print(f"{'root':>10} {'frontier':>9} {'children':>9} {'objects (ms)':>13} "
+        f"{'batch (ms)':>11}")
+    for seeds in [[9, 11], [16, 21], [21, 25]]:
+        frontier = [child for _, child in Position(seeds).children()]
+        start = time.perf_counter()
+        count = len(objects(frontier))
+        middle = time.perf_counter()
+        batched(frontier)
+        end = time.perf_counter()
+        print(f"{str(seeds):>10} {len(frontier):>9} {count:>9} "
+            f"{1000 * (middle - start):>13.1f} {1000 * (end - middle):>11.1f}")
+
+if __name__ == "__main__":
+    main()
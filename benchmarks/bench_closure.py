@@ -0,0 +1,40 @@
+"""Benchmark the word-parallel closure against the original bit loop used by
+`Position._add`.
+
+Usage: python benchmarks/bench_closure.py
+"""
+
+from sylver.position import Position, closure, from_int, to_int
+
+import timeit
+
+
+def loop_add(array, n):
+    """Original `Position._add` fill: one strided assignment per member."""
+    array = array.copy()
+    for i, bit in enumerate(array):
+        if not bit:
+            continue
+        array[i::n] = 1
+    return array
+
+def shift_add(array, n):
+    """Closure computed with shift doubling."""
+    return from_int(closure(to_int(array), n, len(array)), len(array))
+
+def main(number=20):
+    cases = [([5, 7], 9), ([9, 11], 13), ([16, 21], 23), ([31, 37], 41),
+        ([61, 67], 71)]
+    print(f"{'position':>12} {'move':>5} {'length':>7} {'loop (ms)':>10} "
+        f"{'shift (ms)':>10} {'speedup':>8}")
+    for seeds, n in cases:
+        array = Position(seeds).bitarray
+        assert loop_add(array, n) == shift_add(array, n)
+        loop = timeit.timeit(lambda: loop_add(array, n), number=number)
+        shift = timeit.timeit(lambda: shift_add(array, n), number=number)
+        print(f"{str(seeds):>12} {n:>5} {len(array):>7} "
+            f"{1000 * loop / number:>10.3f} {1000 * shift / number:>10.3f} "
+            f"{loop / shift:>7.1f}x")
+
+if __name__ == "__main__":
+    main()
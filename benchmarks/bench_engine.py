@@ -0,0 +1,46 @@
+"""Compare the recursive `solve.solve` with the explicit stack
+`engine.Solver` on the `bench_order` corpus (nodes and nodes/sec). Each run
+uses a fresh MemoryBackend.
+
+Usage: python benchmarks/bench_engine.py
+"""
+
+from bench_order import CORPUS, CountingBackend
+from sylver.engine import Solver
+from sylver.position import Position
+from sylver.solve import solve
+
+import contextlib
+import io
+import time
+
+
+def run(seeds, engine):
+    backend = CountingBackend()
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        if engine:
+            status = Solver(Position(seeds), backend=backend).run()
+        else:
+            status = solve(Position(seeds), backend=backend)
+    return status, backend.nodes, time.perf_counter() - start
+
+def main():
+    print(f"{'position':>20}{'nodes':>10}{'recursive/s':>14}{'engine/s':>14}")
+    totals = [0, 0.0, 0.0]
+    for seeds in CORPUS:
+        status, nodes, recursive = run(seeds, engine=False)
+        engine_status, engine_nodes, engine = run(seeds, engine=True)
+        assert (status, nodes) == (engine_status, engine_nodes), \
+            f"{seeds}: solvers disagree"
+        totals[0] += nodes
+        totals[1] += recursive
+        totals[2] += engine
+        print(f"{str(seeds):>20}{nodes:>10}{nodes / recursive:>14.0f}"
+            f"{nodes / engine:>14.0f}")
+    nodes, recursive, engine = totals
+    print(f"{'total':>20}{nodes:>10}{nodes / recursive:>14.0f}"
+        f"{nodes / engine:>14.0f}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,62 @@
+"""Compare move orderings for `solve.solve` on a fixed corpus of positions,
+counting nodes (positions solved, including cached and quick ones) and wall
+time. Each run uses a fresh MemoryBackend.
+
+Usage: python benchmarks/bench_order.py
+"""
+
+from sylver.backend import MemoryBackend
+from sylver.order import ORDERINGS
+from sylver.position import Position
+from sylver.solve import solve
+
+import contextlib
+import io
+import time
+
+CORPUS = [[4], [6], [9], [10], [14], [15], [6, 9], [8, 9, 13], [10, 11, 13],
+    [11, 14, 17], [10, 13, 17], [12, 13, 17], [8, 12, 18, 22, 31],
+    [8, 12, 18, 22, 41], [10, 14, 26, 31]]
+
+
+class CountingBackend(MemoryBackend):
+
+    def __init__(self):
+        super().__init__()
+        self.nodes = 0
+
+    def save(self, position, status, replies):
+        self.nodes += 1
+        super().save(position, status, replies)
+
+def run(seeds, order, reverse):
+    backend = CountingBackend()
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        status = solve(Position(seeds), backend=backend, reverse=reverse,
+            order=ORDERINGS[order]())
+    return status, backend.nodes, time.perf_counter() - start
+
+def main():
+    configs = [(name, reverse) for reverse in (False, True)
+        for name in ORDERINGS]
+    header = "".join(f"{name + (' rev' if rev else ''):>18}"
+        for name, rev in configs)
+    print(f"{'position':>20}{header}")
+    totals = [[0, 0.0] for _ in configs]
+    for seeds in CORPUS:
+        cells = []
+        statuses = set()
+        for total, (name, reverse) in zip(totals, configs):
+            status, nodes, elapsed = run(seeds, name, reverse)
+            statuses.add(status)
+            total[0] += nodes
+            total[1] += elapsed
+            cells.append(f"{nodes:>8} {1000 * elapsed:>7.1f}ms")
+        assert len(statuses) == 1, f"{seeds}: orderings disagree"
+        print(f"{str(seeds):>20}" + "".join(f"{c:>18}" for c in cells))
+    print(f"{'total':>20}" + "".join(f"{n:>8} {1000 * t:>7.1f}ms"
+        .rjust(18) for n, t in totals))
+
+if __name__ == "__main__":
+    main()
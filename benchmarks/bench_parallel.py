@@ -0,0 +1,42 @@
+"""Wall time of `parallel.solve` with increasing process counts against the
+serial `solve.solve` on the larger `bench_order` positions.
+
+Usage: python benchmarks/bench_parallel.py [max processes]
+"""
+
+from bench_order import CORPUS
+from sylver import parallel
+from sylver.position import Position
+from sylver.solve import solve
+
+import contextlib
+import io
+import os
+import sys
+import time
+
+
+def run(seeds, processes):
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        if processes:
+            status = parallel.solve(Position(seeds), processes=processes)
+        else:
+            status = solve(Position(seeds))
+    return status, time.perf_counter() - start
+
+def main():
+    top = int(sys.argv[1]) if len(sys.argv) > 1 else os.cpu_count()
+    counts = [0] + [n for n in (1, 2, 4, 8, 16) if n <= top]
+    header = "".join(f"{'serial' if n == 0 else f'{n} procs':>12}"
+        for n in counts)
+    print(f"{'position':>20}{header}")
+    for seeds in CORPUS[-6:]:
+        results = [run(seeds, n) for n in counts]
+        assert len({status for status, _ in results}) == 1, \
+            f"{seeds}: solvers disagree"
+        print(f"{str(seeds):>20}" + "".join(f"{1000 * t:>10.0f}ms"
+            for _, t in results))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,49 @@
+"""Benchmark the cost of deriving child positions (one per node of a solve).
+
+Reports, per child over every gap of a few parent positions: the time to
+derive the child, the time to derive it and screen it the way `solve.solve`
+does (key plus `quick()`), and the memory allocated.
+
+Usage: python benchmarks/bench_position.py
+"""
+
+from sylver.position import Position
+from sylver.solve import quick
+
+import time
+import tracemalloc
+
+
+def children(position):
+    make = getattr(position, "child", position.add)
+    return [make(gap) for gap in position.gaps()]
+
+def screened(position):
+    for child in children(position):
+        getattr(child, "key", None)
+        quick(child)
+
+def timed(func, position, number):
+    start = time.perf_counter()
+    for _ in range(number):
+        func(position)
+    return (time.perf_counter() - start) / number
+
+def main(number=5):
+    cases = [[5, 7], [9, 11], [16, 21], [21, 25], [31, 37]]
+    print(f"{'position':>10} {'children':>9} {'us/child':>9} "
+        f"{'us/screened':>12} {'bytes/child':>12}")
+    for seeds in cases:
+        position = Position(seeds)
+        count = len(children(position))
+        child = timed(children, position, number) / count
+        screen = timed(screened, position, number) / count
+        tracemalloc.start()
+        kept = children(position)
+        size, _ = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        print(f"{str(seeds):>10} {count:>9} {1e6 * child:>9.1f} "
+            f"{1e6 * screen:>12.1f} {size / count:>12.0f}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,43 @@
+"""Child solves saved by the `sylver.prune` rules on the `bench_order`
+corpus: nodes (positions solved, including cached and quick ones) without
+and with pruning, and the moves skipped by each rule. Each run uses a fresh
+MemoryBackend.
+
+Usage: python benchmarks/bench_prune.py
+"""
+
+from bench_order import CORPUS, CountingBackend
+from sylver.position import Position
+from sylver.prune import Pairing
+from sylver.solve import solve
+
+import contextlib
+import io
+
+
+def run(seeds, reverse, prune):
+    backend = CountingBackend()
+    with contextlib.redirect_stdout(io.StringIO()):
+        status = solve(Position(seeds), backend=backend, reverse=reverse,
+            prune=prune)
+    return status, backend.nodes
+
+def main():
+    print(f"{'position':>20}{'rev':>5}{'nodes':>10}{'pruned':>10}"
+        f"{'pair':>8}{'clique':>8}")
+    totals = [0, 0, 0, 0]
+    for reverse in (False, True):
+        for seeds in CORPUS:
+            status, nodes = run(seeds, reverse, None)
+            prune = Pairing()
+            pruned_status, pruned = run(seeds, reverse, prune)
+            assert status == pruned_status, f"{seeds}: pruning disagrees"
+            row = [nodes, pruned, prune.stats["pair"], prune.stats["clique"]]
+            totals = [t + r for t, r in zip(totals, row)]
+            print(f"{str(seeds):>20}{'y' if reverse else '':>5}"
+                f"{row[0]:>10}{row[1]:>10}{row[2]:>8}{row[3]:>8}")
+    print(f"{'total':>20}{'':>5}{totals[0]:>10}{totals[1]:>10}"
+        f"{totals[2]:>8}{totals[3]:>8}")
+
+if __name__ == "__main__":
+    main()
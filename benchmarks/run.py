@@ -0,0 +1,259 @@
+"""Benchmark suite with machine readable output, to compare runs across
+commits. Groups:
+
+- position: `Position.__init__`, `add`, `gaps` and `apery_set` over a grid of
+  generators and lengths (seconds per call)
+- solve: `solve.solve` without the known table on a fixed corpus, the
+  singletons 1-11 and some pairs and triples (nodes, seconds, nodes per
+  second)
+- tree: `tree.tree` and `tree.solve` on small roots
+- backend: save, get_status and get_statuses throughput of each backend.
+  Redis uses fakeredis (or the server at $SYLVER_REDIS_URL) and Postgres a
+  local server started with pgserver (or the database at $SYLVER_POSTGRES),
+  and are skipped when unavailable.
+
+Results are written as JSON: {"meta": {...}, "results": {name: {metric:
+value}}}.
+
+Usage:
+    python benchmarks/run.py [--only position,solve] [--output FILE]
+    python benchmarks/run.py --compare BASE.json NEW.json
+"""
+
+from sylver.backend import BoundedMemoryBackend, CachedBackend, MemoryBackend
+from sylver.backend.hashfile import HashFileBackend
+from sylver.backend.sqlite import SQLiteBackend
+from sylver.position import Position
+from sylver.solve import solve
+
+import argparse
+import contextlib
+import datetime
+import io
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+import timeit
+
+POSITIONS = [[5, 7], [9, 11], [16, 21], [31, 37], [8, 9, 13], [12, 13, 17]]
+# Multiples of the default length
+LENGTHS = [1, 4]
+SOLVE_CORPUS = [[n] for n in range(1, 12)] + [[2, 3], [4, 6], [5, 7],
+    [6, 9], [8, 9, 13], [10, 11, 13], [11, 14, 17], [10, 13, 17],
+    [12, 13, 17], [10, 14, 26, 31], [8, 12, 18, 22, 31],
+    [8, 12, 18, 22, 41]]
+TREE_ROOTS = [[5, 6], [4, 7], [5, 7], [6, 7], [7, 8]]
+BACKEND_POSITIONS = 2000
+
+
+class CountingBackend(MemoryBackend):
+
+    def __init__(self):
+        super().__init__()
+        self.nodes = 0
+
+    def save(self, position, status, replies):
+        self.nodes += 1
+        super().save(position, status, replies)
+
+def per_call(func, repeat=3):
+    """Best seconds per call of func over `repeat` timeit autoranges."""
+    timer = timeit.Timer(func)
+    number, _ = timer.autorange()
+    return min(timer.repeat(repeat=repeat, number=number)) / number
+
+def bench_position():
+    results = {}
+    for seeds in POSITIONS:
+        default = Position(seeds).length
+        for length in [default * n for n in LENGTHS]:
+            position = Position(seeds, length=length)
+            gaps = list(position.gaps())
+            move = gaps[len(gaps) // 2]
+            m = position.multiplicity
+            name = f"position/{seeds}/length={length}"
+            results[f"{name}/init"] = {"seconds": per_call(
+                lambda: Position(seeds, length=length))}
+            results[f"{name}/add"] = {"seconds": per_call(
+                lambda: position.add(move))}
+            results[f"{name}/gaps"] = {"seconds": per_call(
+                lambda: list(position.gaps()))}
+            results[f"{name}/apery_set"] = {"seconds": per_call(
+                lambda: position.apery_set(m))}
+    return results
+
+def bench_solve(repeat=3):
+    results = {}
+    for seeds in SOLVE_CORPUS:
+        best = None
+        for _ in range(repeat):
+            backend = CountingBackend()
+            start = time.perf_counter()
+            with contextlib.redirect_stdout(io.StringIO()):
+                status = solve(Position(seeds), backend=backend,
+                    known=None)
+            elapsed = time.perf_counter() - start
+            best = elapsed if best is None else min(best, elapsed)
+        results[f"solve/{seeds}"] = {
+            "status": status,
+            "nodes": backend.nodes,
+            "seconds": best,
+            "nodes_per_second": backend.nodes / best,
+        }
+    nodes = sum(r["nodes"] for r in results.values())
+    seconds = sum(r["seconds"] for r in results.values())
+    results["solve/total"] = {"nodes": nodes, "seconds": seconds,
+        "nodes_per_second": nodes / seconds}
+    return results
+
+def bench_tree(repeat=3):
+    from sylver import tree
+    results = {}
+    for seeds in TREE_ROOTS:
+        build = per_call(lambda: tree.tree(Position(seeds)), repeat=repeat)
+        graph = tree.tree(Position(seeds))
+        results[f"tree/{seeds}"] = {
+            "nodes": len(graph),
+            "edges": graph.n_edges,
+            "tree_seconds": build,
+            "solve_seconds": per_call(lambda: tree.solve(graph),
+                repeat=repeat),
+        }
+    return results
+
+def backends(directory):
+    """Yields (name, factory) for each available backend."""
+    yield "memory", MemoryBackend
+    yield "bounded", BoundedMemoryBackend
+    yield "cached", lambda: CachedBackend(MemoryBackend())
+    yield "hashfile", lambda: HashFileBackend(os.path.join(directory,
+        f"{time.perf_counter_ns()}.hash"))
+    yield "sqlite", lambda: SQLiteBackend(os.path.join(directory,
+        f"{time.perf_counter_ns()}.db"))
+    try:
+        from sylver.backend.redis import RedisBackend
+        if os.environ.get("SYLVER_REDIS_URL"):
+            import redis
+            yield "redis", lambda: RedisBackend(client=redis.Redis.from_url(
+                os.environ["SYLVER_REDIS_URL"]))
+        else:
+            import fakeredis
+            yield "redis (fakeredis)", lambda: RedisBackend(
+                client=fakeredis.FakeRedis())
+    except ImportError:
+        pass
+    try:
+        from sylver.backend.postgres import PostgresBackend
+        if os.environ.get("SYLVER_POSTGRES"):
+            yield "postgres", lambda: PostgresBackend(
+                os.environ["SYLVER_POSTGRES"], batch_size=1000)
+        else:
+            import pgserver
+            server = pgserver.get_server(os.path.join(directory, "pgdata"))
+            try:
+                yield "postgres (pgserver)", lambda: PostgresBackend(
+                    server.get_uri(), batch_size=1000)
+            finally:
+                server.cleanup()
+    except ImportError:
+        pass
+
+def bench_backend():
+    positions = [Position([11, n]) for n in range(12, 12 + BACKEND_POSITIONS
+        * 11 // 10) if n % 11][:BACKEND_POSITIONS]
+    for position in positions:
+        position.key
+        position.to_dict()
+    results = {}
+    with tempfile.TemporaryDirectory() as directory:
+        for name, factory in backends(directory):
+            backend = factory()
+            start = time.perf_counter()
+            for i, position in enumerate(positions):
+                backend.save(position, "PN"[i % 2], [i % 7 + 1])
+            if hasattr(backend, "flush"):
+                backend.flush()
+            saves = time.perf_counter() - start
+            start = time.perf_counter()
+            for position in positions:
+                backend.get_status(position)
+            gets = time.perf_counter() - start
+            start = time.perf_counter()
+            for i in range(0, len(positions), 50):
+                backend.get_statuses(positions[i:i + 50])
+            batch = time.perf_counter() - start
+            if hasattr(backend, "close"):
+                backend.close()
+            results[f"backend/{name}"] = {
+                "saves_per_second": len(positions) / saves,
+                "gets_per_second": len(positions) / gets,
+                "batch_gets_per_second": len(positions) / batch,
+            }
+    return results
+
+GROUPS = {
+    "position": bench_position,
+    "solve": bench_solve,
+    "tree": bench_tree,
+    "backend": bench_backend,
+}
+
+def meta():
+    try:
+        commit = subprocess.run(["git", "rev-parse", "HEAD"],
+            capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {
+        "commit": commit,
+        "time": datetime.datetime.now(datetime.timezone.utc).isoformat(),
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "processor": platform.processor(),
+    }
+
+def compare(base, new):
+    """Print the ratio new/base of every numeric metric in both runs."""
+    with open(base) as f:
+        base = json.load(f)["results"]
+    with open(new) as f:
+        new = json.load(f)["results"]
+    print(f"{'benchmark':<50}{'metric':>24}{'base':>12}{'new':>12}"
+        f"{'ratio':>8}")
+    for name in sorted(set(base) & set(new)):
+        for metric, value in new[name].items():
+            old = base[name].get(metric)
+            if isinstance(value, (int, float)) and isinstance(old,
+                    (int, float)) and old:
+                print(f"{name:<50}{metric:>24}{old:>12.4g}{value:>12.4g}"
+                    f"{value / old:>8.2f}")
+
+def main():
+    parser = argparse.ArgumentParser(description="Sylver benchmark suite.")
+    parser.add_argument("--only", type=str, default=",".join(GROUPS),
+        help="Comma separated groups to run.")
+    parser.add_argument("--output", type=str, default=None,
+        help="Write the JSON results to a file instead of stdout.")
+    parser.add_argument("--compare", nargs=2, metavar=("BASE", "NEW"),
+        help="Compare two result files.")
+    args = parser.parse_args()
+    if args.compare:
+        compare(*args.compare)
+        return
+    results = {}
+    for group in args.only.split(","):
+        print(f"Running {group}", file=sys.stderr)
+        results.update(GROUPS[group]())
+    output = json.dumps({"meta": meta(), "results": results}, indent=1)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(output)
+    else:
+        print(output)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,130 @@
+"""Time and node budgeted ("anytime") solving."""
+
+from .backend import MemoryBackend
+from .engine import Solver
+from .known import KNOWN, KnownPositions
+from .solve import Node
+
+import time
+
+# Nodes each move is searched for in the first round (doubled every round),
+# and at most between checks of the deadline
+ALLOWANCE = 16
+SLICE = 256
+
+
+def solve(position, backend=None, seconds=None, nodes=None, reverse=False,
+        deep=False, order=None, prune=None, known=KNOWN):
+    """Solve a position within a budget, returning what is known so far.
+
+    The moves of the position are searched in rounds, each move with its own
+    paused `engine.Solver`. In every round each undecided move is searched
+    for an allowance of nodes that doubles from round to round (iterative
+    deepening of the effort), so cheap moves are decided first and no move
+    starves the others. Subtrees decided along the way are saved to the
+    backend, so later calls with the same backend find them there instead of
+    searching them again and make progress where the last call stopped. To
+    skip them cheaply every node prechecks its children in the backend (see
+    `solve.Node.precheck`), with an empty table if `known` is None.
+
+    Args:
+        `seconds`: Wall clock budget, or None for no limit.
+        `nodes`: Budget of positions visited, or None for no limit.
+        `backend`, `reverse`, `order`, `prune`, `known`: As for
+            `solve.solve`.
+        `deep`: Keep searching the moves after a winning reply is found.
+
+    Returns:
+        dict: with keys
+            status: "P", "N", "?" (undetermined, as for `solve.solve`), or
+                None if the budget ran out first.
+            replies: The winning moves found (to P children).
+            losing: The moves to children proven N.
+            unknown: The moves not yet decided, or undetermined. For a
+                position decided without a search (by `quick` or a lookup)
+                the moves are not examined and all three lists may be
+                empty.
+            nodes: The number of positions visited.
+    """
+    backend = backend or MemoryBackend()
+    known = KnownPositions() if known is None else known
+    deadline = None if seconds is None else time.monotonic() + seconds
+    root = Node(position, backend, reverse=reverse, order=order, known=known,
+        deep=deep)
+    visited = 1
+    losing = root.skip - root.replies
+    if not root.kind:
+        replies = backend.get_replies(position) \
+            if root.status == "N" and root.source == "backend" else set()
+        return _result(root.status, replies, losing, [], visited)
+    moves = {}
+    while True:
+        move = root.next_child()
+        if move is None:
+            break
+        moves[move[0]] = move[1]
+    solvers = {}
+    undetermined = set()
+    allowance = ALLOWANCE
+    while moves and not (root.replies and not deep):
+        for gap in list(moves):
+            if gap not in moves:
+                # Pruned by an earlier move of this round
+                continue
+            solver = solvers.get(gap)
+            if solver is None:
+                solver = solvers[gap] = Solver(moves[gap], backend=backend,
+                    reverse=reverse, order=order, prune=prune, known=known)
+                visited += 1
+            status, spent = None, 0
+            while status is None and spent < allowance:
+                if deadline is not None and time.monotonic() >= deadline \
+                        or nodes is not None and visited >= nodes:
+                    return _finish(root, backend, losing,
+                        undetermined.union(moves), visited)
+                step = min(SLICE, allowance - spent)
+                if nodes is not None:
+                    step = min(step, nodes - visited)
+                start = solver.nodes
+                status = solver.run(max_nodes=step)
+                spent += step
+                visited += solver.nodes - start
+            if status is None:
+                continue
+            child = moves.pop(gap)
+            del solvers[gap]
+            if status == "N":
+                losing.add(gap)
+            elif status == "?":
+                undetermined.add(gap)
+            root.update(gap, status, deep=deep, order=order)
+            if prune and status == "N":
+                # The root's moves were all drawn up front, so prune among
+                # the pending ones rather than the root's remaining gaps
+                pruned = prune.skip(position, gap, child, backend,
+                    set(moves))
+                root.skip |= pruned
+                for move in pruned:
+                    del moves[move]
+                    solvers.pop(move, None)
+                    losing.add(move)
+            if root.replies and not deep:
+                break
+        allowance *= 2
+    status = root.finish(backend)
+    return _result(status, root.replies, losing,
+        undetermined.union(moves), visited)
+
+def _finish(root, backend, losing, unknown, visited):
+    """Result of a search that ran out of budget."""
+    status = root.finish(backend) if root.replies else None
+    return _result(status, root.replies, losing, unknown, visited)
+
+def _result(status, replies, losing, unknown, visited):
+    return {
+        "status": status,
+        "replies": sorted(replies),
+        "losing": sorted(losing),
+        "unknown": sorted(unknown),
+        "nodes": visited,
+    }
@@ -0,0 +1,201 @@
+"""Apery set representation of positions."""
+
+from .key import encode as encode_key
+
+from functools import reduce
+import math
+
+
+class AperyPosition(object):
+    """An alternative to `position.Position` which is backed by the Apery set
+    of the reduced semigroup with respect to its multiplicity m, i.e. the
+    m-tuple whose i'th entry is the least member congruent to i mod m. This
+    is only m integers long, whereas the bit set of a `Position` grows with
+    the Frobenius bound, so positions with large generators stay cheap.
+
+    As for `Position`, when the gcd is greater than 1 all quantities are with
+    respect to the reduced semigroup (the members divided by the gcd) and
+    scaled back up by the gcd. Positions are immutable.
+    """
+
+    __slots__ = ("gcd", "apery", "_key")
+
+    def __init__(self, seeds):
+        """
+        Initialise the position.
+
+        Args:
+            seeds ([int]): a list of positive integers that are equivalent to
+                numbers that have been played.
+        """
+        seeds = sorted(set([int(s) for s in seeds]))
+        if len(seeds) < 1:
+            raise ValueError("Seeds must have at least one element.")
+        if any([s < 1 for s in seeds]):
+            raise ValueError("Seeds cannot contain non-positive integers")
+        self.gcd = int(reduce(math.gcd, seeds))
+        reduced = [s // self.gcd for s in seeds]
+        # Round robin: start from the multiplicity and relax each generator
+        m = reduced[0]
+        apery = [0] + [math.inf] * (m - 1)
+        for s in reduced[1:]:
+            _relax(apery, s)
+        self.apery = tuple(apery)
+        self._key = None
+
+    @classmethod
+    def from_position(cls, position):
+        """Create from a `position.Position` using its Apery set."""
+        pos = cls.__new__(cls)
+        pos.gcd = position.gcd
+        m = position.multiplicity // position.gcd
+        pos.apery = tuple(w // position.gcd for w in position.apery_set(m))
+        pos._key = None
+        return pos
+
+    def to_position(self, length=None):
+        """Returns the equivalent `position.Position`."""
+        from .position import Position
+        return Position(self.generators, length=length)
+
+    def __repr__(self):
+        return f"AperyPosition({self.generators})"
+
+    def __str__(self):
+        generators = str(self.generators)
+        return "{{{}}}".format(generators[1:-1])
+
+    def __contains__(self, n):
+        if n < 0 or n % self.gcd:
+            return False
+        n = n // self.gcd
+        return n >= self.apery[n % len(self.apery)]
+
+    @property
+    def name(self):
+        return str(self)
+
+    @property
+    def key(self):
+        """Returns the canonical compact key (see `sylver.key`)."""
+        if self._key is None:
+            self._key = encode_key(self.generators)
+        return self._key
+
+    @property
+    def generators(self):
+        """Returns the minimal generators. Apart from the multiplicity, the
+        entry w_i is a minimal generator unless w_i = w_j + w_(i - j) for some
+        other nonzero residue j. This takes O(m^2).
+        """
+        apery = self.apery
+        m = len(apery)
+        generators = [m]
+        for i in range(1, m):
+            if not any(apery[j] + apery[(i - j) % m] == apery[i]
+                    for j in range(1, m) if j != i):
+                generators.append(apery[i])
+        return sorted(g * self.gcd for g in generators)
+
+    @property
+    def embedding_dim(self):
+        """Returns the cardinality of the minimal set of generators."""
+        return len(self.generators)
+
+    @property
+    def multiplicity(self):
+        """Returns least positive integer belonging to P."""
+        return len(self.apery) * self.gcd
+
+    @property
+    def frobenius(self):
+        """Returns the largest gap of the reduced semigroup (times the gcd),
+        which is the largest Apery element less the multiplicity.
+        """
+        return max(max(self.apery) - len(self.apery), 0) * self.gcd
+
+    @property
+    def genus(self):
+        """Returns cardinality of the set of gaps, using Selmer's formula
+        g = (1/m) sum(w) - (m - 1)/2.
+        """
+        m = len(self.apery)
+        return (2 * sum(self.apery) - m * (m - 1)) // (2 * m)
+
+    @property
+    def irreducible(self):
+        """Returns None, 's' (symmetric) or 'p' (pseudosymmetric) as for
+        `Position.irreducible`.
+        """
+        reduced_frob = self.frobenius // self.gcd
+        genus = self.genus
+        if genus == 0:
+            return "p"
+        if genus == reduced_frob // 2 + 1:
+            return "s" if (reduced_frob % 2) else "p"
+        return None
+
+    def gaps(self, reverse=False, length=None):
+        """Returns a lazy iterator over the gaps below `length` (by default
+        the frobenius plus one, which covers all gaps when the gcd is 1).
+        """
+        if length is None:
+            length = self.frobenius + 1
+        numbers = range(length - 1, 0, -1) if reverse else range(1, length)
+        for n in numbers:
+            if n not in self:
+                yield n
+
+    def to_dict(self):
+        """Returns dict of properties."""
+        return {
+            "name": self.name,
+            "generators": self.generators,
+            "gcd": self.gcd,
+            "multiplicity": self.multiplicity,
+            "genus": self.genus,
+            "frobenius": self.frobenius,
+            "irreducible": self.irreducible,
+        }
+
+    def add(self, n):
+        """Add a number to the position, i.e. make a move. Returns a new
+        object. When `n` keeps the gcd and the multiplicity this is a single
+        O(m) round robin pass over the Apery set, otherwise the Apery set is
+        rebuilt from the generators.
+
+        Args:
+            n (int): The number to add.
+
+        Returns:
+            pos (AperyPosition): Resulting position.
+        """
+        n = int(n)
+        if n < 1:
+            raise ValueError("Cannot add a non-positive integer")
+        if n in self:
+            return self
+        if n % self.gcd or n < self.multiplicity:
+            return AperyPosition(self.generators + [n])
+        apery = list(self.apery)
+        _relax(apery, n // self.gcd)
+        pos = AperyPosition.__new__(AperyPosition)
+        pos.gcd = self.gcd
+        pos.apery = tuple(apery)
+        pos._key = None
+        return pos
+
+def _relax(apery, n):
+    """Update an Apery set (in place) with the generator `n`. The residues mod
+    m split into gcd(n, m) cycles under adding n. Going once around each cycle
+    from its least element settles every entry.
+    """
+    m = len(apery)
+    for start in range(math.gcd(n, m)):
+        cycle = [(start + k * n) % m for k in range(m // math.gcd(n, m))]
+        i = min(cycle, key=lambda r: apery[r])
+        for _ in cycle:
+            j = (i + n) % m
+            if apery[i] + n < apery[j]:
+                apery[j] = apery[i] + n
+            i = j
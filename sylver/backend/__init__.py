@@ -1 +1 @@
-from .backend import MemoryBackend
\ No newline at end of file
+from .backend import BoundedMemoryBackend, CachedBackend, MemoryBackend
@@ -1,5 +1,10 @@
 """Backends for storage of positions."""
 
+from array import array
+from collections import OrderedDict
+import heapq
+import threading
+
 class BaseBackend():
     
     def __init__(self):
@@ -7,7 +12,8 @@ class BaseBackend():
     
     def save(self, position, status, replies):
         """Save a position (specified by its `to_dict()` method), determined 
-        `status`, and add the `replies`.
+        `status`, and add the `replies`. Positions are stored under their
+        canonical compact `key`.
         """
         raise NotImplementedError()
     
@@ -16,13 +22,24 @@ class BaseBackend():
         """
         raise NotImplementedError()
 
+    def get_replies(self, position):
+        """Get the set of known replies of a position.
+        """
+        raise NotImplementedError()
+
+    def get_statuses(self, positions):
+        """Get the statuses of a list of positions (None where unknown).
+        Backends should override this to look them up in one batch.
+        """
+        return [self.get_status(position) for position in positions]
+
 class MemoryBackend(BaseBackend):
 
     def __init__(self):
         self.positions = {}
 
     def save(self, position, status, replies):
-        key = position.name
+        key = position.key
         existing = self.positions.get(key, {})
         self.positions[key] = {
             **position.to_dict(),
@@ -31,5 +48,179 @@ class MemoryBackend(BaseBackend):
         }
     
     def get_status(self, position):
-        key = position.name
+        key = position.key
         return self.positions.get(key, {}).get("status")
+
+    def get_replies(self, position):
+        key = position.key
+        return self.positions.get(key, {}).get("replies", set())
+
+# Statuses packed into the low 2 bits of a record header
+STATUS_CODES = {"P": 1, "N": 2, "?": 3}
+STATUSES = {code: status for status, code in STATUS_CODES.items()}
+
+class BoundedMemoryBackend(BaseBackend):
+    """Memory-bounded transposition table. Each record is a compact unsigned
+    int array: a header holding the status in 2 bits and the genus above
+    them, followed by the replies. When the table grows past `max_size` the
+    lowest priority records are evicted in a batch. P-positions are kept in
+    preference to others, then positions with larger genus (more expensive
+    to recompute), then more recently saved ones.
+    """
+
+    def __init__(self, max_size=1000000, evict_fraction=0.1):
+        """
+        Args:
+            max_size (int): Maximum number of positions to keep.
+            evict_fraction (float): Fraction of `max_size` to evict at once
+                when full.
+        """
+        self.max_size = max_size
+        self.evict_fraction = evict_fraction
+        self.positions = {}
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @property
+    def stats(self):
+        """Returns the table size and hit, miss and eviction counts."""
+        return {
+            "size": len(self.positions),
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+        }
+
+    def save(self, position, status, replies):
+        key = position.key
+        replies = set(replies)
+        # Popped so that a re-saved record moves to the end (most recent)
+        existing = self.positions.pop(key, None)
+        if existing is not None:
+            replies.update(existing[1:])
+        record = array("I", [STATUS_CODES[status] | position.genus << 2])
+        record.extend(sorted(replies))
+        self.positions[key] = record
+        if len(self.positions) > self.max_size:
+            self._evict()
+
+    def get_status(self, position):
+        record = self.positions.get(position.key)
+        if record is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return STATUSES[record[0] & 3]
+
+    def get_replies(self, position):
+        record = self.positions.get(position.key)
+        return set(record[1:]) if record is not None else set()
+
+    def _evict(self):
+        count = len(self.positions) - self.max_size \
+            + int(self.max_size * self.evict_fraction)
+        victims = heapq.nsmallest(count, self.positions.items(),
+            key=_priority)
+        for key, _ in victims:
+            del self.positions[key]
+        self.evictions += len(victims)
+
+class CachedBackend(BaseBackend):
+    """Read-through cache of final (P/N) statuses in front of another
+    backend, e.g. Redis or Postgres. Statuses are looked up in an in-process
+    LRU of `size` positions, then in the optional `shared` tier (typically a
+    `hashfile.HashFileBackend` shared by the processes on a machine), then in
+    the wrapped backend. Saves go to the backend and P/N results are cached.
+    "?" statuses are never cached, since they can still change. Replies are
+    always read from the backend. The LRU is guarded by a lock, so the cache
+    can be shared by threads (e.g. of a Flask app) if the backends can.
+    """
+
+    def __init__(self, backend, size=100000, shared=None):
+        """
+        Args:
+            backend (BaseBackend): The backend to wrap.
+            size (int): Maximum number of statuses in the LRU.
+            shared (BaseBackend): Optional second tier.
+        """
+        self.backend = backend
+        self.size = size
+        self.shared = shared
+        self.cache = OrderedDict()
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.shared_hits = 0
+        self.misses = 0
+
+    @property
+    def stats(self):
+        """Returns the LRU size, hit counts per tier, misses (lookups that
+        reached the backend) and the overall hit rate.
+        """
+        lookups = self.hits + self.shared_hits + self.misses
+        return {
+            "size": len(self.cache),
+            "hits": self.hits,
+            "shared_hits": self.shared_hits,
+            "misses": self.misses,
+            "hit_rate": (self.hits + self.shared_hits) / lookups
+                if lookups else 0.0,
+        }
+
+    def _cache(self, key, status):
+        with self.lock:
+            self.cache[key] = status
+            self.cache.move_to_end(key)
+            if len(self.cache) > self.size:
+                self.cache.popitem(last=False)
+
+    def save(self, position, status, replies):
+        self.backend.save(position, status, replies)
+        if status in ["P", "N"]:
+            self._cache(position.key, status)
+            if self.shared is not None:
+                self.shared.save(position, status, replies)
+
+    def get_status(self, position):
+        return self.get_statuses([position])[0]
+
+    def get_statuses(self, positions):
+        with self.lock:
+            statuses = [self.cache.get(position.key)
+                for position in positions]
+            for i, status in enumerate(statuses):
+                if status is not None:
+                    self.hits += 1
+                    self.cache.move_to_end(positions[i].key)
+        missing = [i for i, status in enumerate(statuses) if status is None]
+        if missing and self.shared is not None:
+            shared = self.shared.get_statuses([positions[i] for i in missing])
+            for i, status in zip(missing, shared):
+                if status in ["P", "N"]:
+                    with self.lock:
+                        self.shared_hits += 1
+                    statuses[i] = status
+                    self._cache(positions[i].key, status)
+            missing = [i for i in missing if statuses[i] is None]
+        if missing:
+            with self.lock:
+                self.misses += len(missing)
+            found = self.backend.get_statuses([positions[i] for i in missing])
+            for i, status in zip(missing, found):
+                statuses[i] = status
+                if status in ["P", "N"]:
+                    self._cache(positions[i].key, status)
+                    if self.shared is not None:
+                        self.shared.save(positions[i], status, ())
+        return statuses
+
+    def get_replies(self, position):
+        return self.backend.get_replies(position)
+
+def _priority(item):
+    """Eviction priority of a (key, record) item; smallest is evicted first.
+    Ties keep insertion order, so the least recently saved go first.
+    """
+    header = item[1][0]
+    return (header & 3 == STATUS_CODES["P"], header >> 2)
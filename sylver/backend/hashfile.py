@@ -0,0 +1,219 @@
+"""Memory-mapped hash file backend."""
+
+from .backend import BaseBackend, STATUS_CODES, STATUSES
+
+import fcntl
+import hashlib
+import mmap
+import os
+import struct
+
+# magic, version, slots, used slots, replies per record, moved flag
+HEADER = struct.Struct("<8sIQQIB")
+HEADER_SIZE = 64
+MAGIC = b"SYLVHASH"
+VERSION = 1
+# seq, status, number of replies, (pad), key digest
+RECORD = struct.Struct("<BBBx16s")
+
+
+class HashFileBackend(BaseBackend):
+    """Open addressing hash table in a memory-mapped file, so results
+    persist across restarts with no external service.
+
+    The file is a 64 byte header followed by fixed-size records: a sequence
+    byte, the status, the number of replies, a 128-bit digest of the
+    position key and up to `replies` replies as unsigned 32-bit ints.
+    Records are found by linear probing from the digest.
+
+    Any number of processes can open the same file. Reads go straight to
+    the shared mapping without locks or copies. Writes are serialised with
+    flock on a side lock file and update records in place. The sequence
+    byte is odd while a record is written and is bumped to an even value
+    last (the commit), so readers ignore records that are being written.
+    When the table is `max_load` full the writer rehashes it into a file of
+    twice the size, replaces the old file and flags the old header as
+    moved, so other processes reopen the new file on their next access.
+    """
+
+    def __init__(self, path, slots=1 << 20, replies=4, max_load=0.7):
+        """
+        Args:
+            path (str): The hash file, created if it does not exist.
+            slots (int): Initial number of records (rounded up to a power of
+                2) of a new file.
+            replies (int): Replies kept per record for a new file. Further
+                replies are dropped, keeping the smallest.
+            max_load (float): Fraction of used slots at which the table
+                grows.
+        """
+        self.path = path
+        self.max_load = max_load
+        self.lock = open(f"{path}.lock", "a+")
+        with self._locked():
+            if not os.path.exists(path):
+                slots = 1 << max(slots - 1, 1).bit_length()
+                _create(path, slots, replies)
+            self._open()
+
+    def _open(self):
+        with open(self.path, "r+b") as f:
+            self.map = mmap.mmap(f.fileno(), 0)
+        self.view = memoryview(self.map)
+        magic, version, self.slots, _, self.replies, _ = \
+            HEADER.unpack_from(self.map, 0)
+        if magic != MAGIC or version != VERSION:
+            raise ValueError(f"{self.path} is not a sylver hash file")
+        self.replies_format = struct.Struct(f"<{self.replies}I")
+        self.record_size = RECORD.size + self.replies_format.size
+
+    def close(self):
+        self._unmap()
+        self.lock.close()
+
+    def _unmap(self):
+        self.view.release()
+        self.map.close()
+
+    def _locked(self):
+        return _Flock(self.lock)
+
+    def _reopen_if_moved(self):
+        if self.view[HEADER.size - 1]:
+            self._unmap()
+            self._open()
+
+    def _digest(self, position):
+        return hashlib.blake2b(position.key, digest_size=16).digest()
+
+    def _find(self, digest):
+        """Returns the offset of the record for a digest, or of the empty
+        slot where it would go.
+        """
+        mask = self.slots - 1
+        i = int.from_bytes(digest[:8], "little") & mask
+        size = self.record_size
+        view = self.view
+        while True:
+            offset = HEADER_SIZE + i * size
+            if view[offset] == 0 \
+                    or view[offset + 4:offset + RECORD.size] == digest:
+                return offset
+            i = (i + 1) & mask
+
+    def _read(self, position):
+        """Returns (status, replies) of a committed record, or None."""
+        self._reopen_if_moved()
+        offset = self._find(self._digest(position))
+        seq, code, count, _ = RECORD.unpack_from(self.view, offset)
+        if not seq or seq % 2:
+            return None
+        replies = self.replies_format.unpack_from(self.view,
+            offset + RECORD.size)[:count]
+        if self.view[offset] != seq:
+            return None
+        return STATUSES.get(code), replies
+
+    def save(self, position, status, replies):
+        """HashFileBackend implementation of BaseBackend method. P and N
+        statuses are not overwritten by "?".
+        """
+        digest = self._digest(position)
+        with self._locked():
+            self._reopen_if_moved()
+            offset = self._find(digest)
+            seq, code, count, _ = RECORD.unpack_from(self.view, offset)
+            existing = self.replies_format.unpack_from(self.view,
+                offset + RECORD.size)[:count] if seq else ()
+            if STATUSES.get(code) in ["P", "N"] and status == "?":
+                status = STATUSES[code]
+            merged = sorted(set(existing).union(replies))[:self.replies]
+            self._write(self.view, offset, seq, STATUS_CODES[status], digest,
+                merged)
+            if not seq:
+                self._add_used()
+
+    def _write(self, view, offset, seq, code, digest, replies):
+        commit = seq + 2 if seq + 2 < 256 else 2
+        view[offset] = commit - 1
+        RECORD.pack_into(view, offset, commit - 1, code, len(replies), digest)
+        padded = list(replies) + [0] * (self.replies - len(replies))
+        self.replies_format.pack_into(view, offset + RECORD.size, *padded)
+        view[offset] = commit
+
+    def _add_used(self):
+        used = struct.unpack_from("<Q", self.view, 20)[0] + 1
+        struct.pack_into("<Q", self.view, 20, used)
+        if used > self.max_load * self.slots:
+            self._grow()
+
+    def _grow(self):
+        """Rehash into a file of twice the size (holding the lock)."""
+        tmp = f"{self.path}.tmp"
+        _create(tmp, 2 * self.slots, self.replies)
+        old, old_view = self.map, self.view
+        old_slots = self.slots
+        with open(tmp, "r+b") as f:
+            self.map = mmap.mmap(f.fileno(), 0)
+        self.view = memoryview(self.map)
+        self.slots = 2 * old_slots
+        used = 0
+        for i in range(old_slots):
+            offset = HEADER_SIZE + i * self.record_size
+            seq, code, count, digest = RECORD.unpack_from(old_view, offset)
+            if not seq:
+                continue
+            replies = self.replies_format.unpack_from(old_view,
+                offset + RECORD.size)[:count]
+            self._write(self.view, self._find(digest), 0, code, digest,
+                replies)
+            used += 1
+        struct.pack_into("<Q", self.view, 20, used)
+        self.map.flush()
+        os.replace(tmp, self.path)
+        old_view[HEADER.size - 1] = 1
+        old_view.release()
+        old.close()
+
+    def flush(self):
+        """Flush the mapping to disk."""
+        self.map.flush()
+
+    def get_status(self, position):
+        """HashFileBackend implementation of BaseBackend method.
+        """
+        record = self._read(position)
+        return record[0] if record else None
+
+    def get_replies(self, position):
+        """HashFileBackend implementation of BaseBackend method.
+        """
+        record = self._read(position)
+        return set(record[1]) if record else set()
+
+    @property
+    def stats(self):
+        """Returns the number of positions and slots."""
+        self._reopen_if_moved()
+        return {
+            "size": struct.unpack_from("<Q", self.view, 20)[0],
+            "slots": self.slots,
+        }
+
+class _Flock():
+    """Exclusive flock context manager."""
+
+    def __init__(self, f):
+        self.f = f
+
+    def __enter__(self):
+        fcntl.flock(self.f, fcntl.LOCK_EX)
+
+    def __exit__(self, *args):
+        fcntl.flock(self.f, fcntl.LOCK_UN)
+
+def _create(path, slots, replies):
+    record_size = RECORD.size + 4 * replies
+    with open(path, "wb") as f:
+        f.truncate(HEADER_SIZE + slots * record_size)
+        f.write(HEADER.pack(MAGIC, VERSION, slots, 0, replies, 0))
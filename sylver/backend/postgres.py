@@ -4,20 +4,32 @@ from .backend import BaseBackend
 
 import psycopg2
 from psycopg2 import sql
+from psycopg2.extras import execute_values
+import time
 
 class PostgresBackend(BaseBackend):
 
-    def __init__(self, connection_string):
+    def __init__(self, connection_string, batch_size=1, batch_ms=1000):
         """Initialise PostgreSQL connection with a valid libpq connection 
         string. Create the `position`, `status`, and `reply` tables if they
-        do not yet exist.
+        do not yet exist. Tables created by earlier versions (keyed by name)
+        must be converted once with `migrate()`.
+
+        By default every save is written straight away. With a larger
+        `batch_size` saves are buffered in memory (write-behind) and flushed
+        in bulk by the save that fills the buffer to `batch_size` positions
+        or comes `batch_ms` milliseconds or more after the last flush, and
+        by `flush()` or `close()`. There is no timer: an idle buffer stays
+        unflushed until the next save, so call `flush()` when pausing and
+        `close()` when done. Reads see the unflushed buffer.
         """
         self.conn = psycopg2.connect(connection_string)
         with self.conn:
             with self.conn.cursor() as c:
                 c.execute("""
                     CREATE TABLE IF NOT EXISTS position (
-                        name            text        PRIMARY KEY,
+                        key             bytea       PRIMARY KEY,
+                        name            text        NOT NULL,
                         generators      integer[]   NOT NULL,
                         gcd             integer     NOT NULL,
                         multiplicity    integer     NOT NULL,
@@ -27,55 +39,148 @@ class PostgresBackend(BaseBackend):
                     );""")
                 c.execute("""
                     CREATE TABLE IF NOT EXISTS status (
-                        position        text        PRIMARY KEY,
+                        position        bytea       PRIMARY KEY,
                         status          varchar (2) NOT NULL
                     );""")
                 c.execute("""
                     CREATE TABLE IF NOT EXISTS reply (
-                        position        text        NOT NULL,
+                        position        bytea       NOT NULL,
                         reply           integer     NOT NULL,
                         CONSTRAINT uniquetuple UNIQUE (position, reply)
                     );""")
-        self.position_cols = ("name", "generators", "gcd", "multiplicity",
-            "genus", "frobenius", "irreducible")
+        self.position_cols = ("key", "name", "generators", "gcd",
+            "multiplicity", "genus", "frobenius", "irreducible")
+        self.batch_size = batch_size
+        self.batch_ms = batch_ms
+        self.buffer = {}
+        self.last_flush = time.monotonic()
 
-    def save(self, position, status, replies):
-        """PostgreSQL implementation of BaseBackend method.
+    def migrate(self):
+        """Migrate tables created by earlier versions, which were keyed by the
+        `Position.name` text, to compact binary keys. The key of each position
+        is computed in SQL from its generators (see `sylver.key`).
         """
-        position_dict = {"name": position.name, **position.to_dict()}
-        # Position
-        columns = sql.SQL(",").join(map(sql.Identifier, self.position_cols))
-        values = sql.SQL(",").join(map(sql.Placeholder, self.position_cols))
-        position_query = sql.SQL("""
-            INSERT INTO position ({columns}) VALUES ({values}) 
-            ON CONFLICT (name) DO NOTHING;""").format(
-                columns=columns, values=values)
-        # Status
-        status_query = sql.SQL("""
-            INSERT INTO status (position, status) VALUES (%(name)s, {status})
-            ON CONFLICT (position) DO UPDATE SET status = EXCLUDED.status
-            WHERE status.status != 'P' AND status.status != 'N';
-        """).format(status=sql.Literal(status))
-        # Reply
-        reply_values = [sql.SQL("(%(name)s, {})").format(sql.Literal(r))
-            for r in replies]
-        reply_query = sql.SQL("""
-            INSERT INTO reply (position, reply) VALUES {}
-            ON CONFLICT ON CONSTRAINT uniquetuple DO NOTHING;
-        """).format(sql.SQL(",").join(reply_values))
         with self.conn:
             with self.conn.cursor() as c:
-                c.execute(position_query, position_dict)
-                c.execute(status_query, position_dict)
-                if replies:
-                    c.execute(reply_query, position_dict)
-    
+                c.execute("""
+                    SELECT 1 FROM information_schema.columns
+                    WHERE table_name = 'position' AND column_name = 'key';""")
+                if c.fetchone():
+                    return
+                c.execute("""
+                    ALTER TABLE position ADD COLUMN key bytea;
+                    UPDATE position SET key = (
+                        SELECT string_agg(int4send(g), ''::bytea ORDER BY i)
+                        FROM unnest(generators) WITH ORDINALITY AS t(g, i));
+                    ALTER TABLE position DROP CONSTRAINT position_pkey;
+                    ALTER TABLE position ADD PRIMARY KEY (key);""")
+                for table in ("status", "reply"):
+                    c.execute(sql.SQL("""
+                        ALTER TABLE {table} ADD COLUMN key bytea;
+                        UPDATE {table} SET key = position.key FROM position
+                            WHERE {table}.position = position.name;
+                        ALTER TABLE {table} DROP COLUMN position;
+                        ALTER TABLE {table} RENAME COLUMN key TO position;
+                        """).format(table=sql.Identifier(table)))
+                c.execute("""
+                    ALTER TABLE status ADD PRIMARY KEY (position);
+                    ALTER TABLE reply ALTER COLUMN position SET NOT NULL;
+                    ALTER TABLE reply ADD CONSTRAINT uniquetuple
+                        UNIQUE (position, reply);""")
+
+    def save(self, position, status, replies):
+        """PostgreSQL implementation of BaseBackend method. Saves are
+        buffered (merging saves of the same position) and written by `flush`.
+        """
+        key = position.key
+        entry = self.buffer.get(key)
+        if entry is None:
+            d = position.to_dict()
+            row = (key, *(d[col] for col in self.position_cols[1:]))
+            entry = self.buffer[key] = [row, status, set(replies)]
+        else:
+            if not (entry[1] in ["P", "N"] and status == "?"):
+                entry[1] = status
+            entry[2].update(replies)
+        if len(self.buffer) >= self.batch_size or 1000 * (time.monotonic()
+                - self.last_flush) >= self.batch_ms:
+            self.flush()
+
+    def flush(self):
+        """Write the buffered saves with one multi-row INSERT per table, in
+        a single transaction.
+        """
+        if self.buffer:
+            entries = list(self.buffer.values())
+            position_query = f"""
+                INSERT INTO position ({",".join(self.position_cols)})
+                VALUES %s ON CONFLICT (key) DO NOTHING;"""
+            status_query = """
+                INSERT INTO status (position, status) VALUES %s
+                ON CONFLICT (position) DO UPDATE SET status = EXCLUDED.status
+                WHERE status.status != 'P' AND status.status != 'N';"""
+            reply_query = """
+                INSERT INTO reply (position, reply) VALUES %s
+                ON CONFLICT ON CONSTRAINT uniquetuple DO NOTHING;"""
+            replies = [(row[0], r) for row, _, rs in entries for r in rs]
+            with self.conn:
+                with self.conn.cursor() as c:
+                    execute_values(c, position_query,
+                        [row for row, _, _ in entries], page_size=1000)
+                    execute_values(c, status_query,
+                        [(row[0], status) for row, status, _ in entries],
+                        page_size=1000)
+                    if replies:
+                        execute_values(c, reply_query, replies,
+                            page_size=1000)
+            self.buffer = {}
+        self.last_flush = time.monotonic()
+
+    def close(self):
+        """Flush the buffer and close the connection."""
+        self.flush()
+        self.conn.close()
+
     def get_status(self, position):
-        """PostgreSQL implementation of BaseBackend method.
+        """PostgreSQL implementation of BaseBackend method, reading through
+        the buffer.
+        """
+        return self.get_statuses([position])[0]
+
+    def get_statuses(self, positions):
+        """PostgreSQL implementation of BaseBackend method, with a single
+        query for the positions without a buffered P or N status.
+        """
+        keys = [position.key for position in positions]
+        buffered = {k: self.buffer[k][1] for k in keys if k in self.buffer}
+        lookup = [k for k in keys if buffered.get(k) not in ["P", "N"]]
+        statuses = {}
+        if lookup:
+            query = """SELECT position, status FROM status
+                WHERE position = ANY(%(keys)s);"""
+            with self.conn:
+                with self.conn.cursor() as c:
+                    c.execute(query,
+                        {"keys": [psycopg2.Binary(k) for k in lookup]})
+                    statuses = {bytes(k): s for k, s in c.fetchall()}
+        result = []
+        for k in keys:
+            stored, pending = statuses.get(k), buffered.get(k)
+            # A stored P or N status is kept over a buffered "?"
+            if pending is None or (pending == "?" and stored in ["P", "N"]):
+                result.append(stored)
+            else:
+                result.append(pending)
+        return result
+
+    def get_replies(self, position):
+        """PostgreSQL implementation of BaseBackend method, including
+        buffered replies.
         """
-        query = "SELECT status FROM status WHERE position = %(name)s;"
+        query = "SELECT reply FROM reply WHERE position = %(key)s;"
         with self.conn:
             with self.conn.cursor() as c:
-                c.execute(query, {"name": position.name})
-                result = c.fetchone()
-        return result[0] if result else None
+                c.execute(query, {"key": position.key})
+                replies = set(r[0] for r in c.fetchall())
+        entry = self.buffer.get(position.key)
+        return replies | entry[2] if entry else replies
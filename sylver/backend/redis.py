@@ -1,47 +1,94 @@
 """Redis key-value store backend."""
 
 from .backend import BaseBackend
+from .. import key as keys
 
-import yaml
 import redis
 
 
 class RedisBackend(BaseBackend):
+    """Each position is stored under its binary key (see `sylver.key`) as
+    a one byte string holding the status, with its replies in a Redis set
+    under the key plus ":r". The position properties are not stored since
+    they follow from the key.
 
-    def __init__(self, **kwargs):
-        """Initialise Redis client by passing **kwargs to `redis.Redis`.
-        """
-        self.redis = redis.Redis(**kwargs)
-    
-    def set(self, key, dictionary):
-        """Set a python dictionary as a YAML string in Redis. Note that YAML
-        is used because it supports sets.
+    Saves are a single pipelined round trip with no read before the write:
+    SET for P/N statuses, SETNX for "?" (so a P/N status is never
+    overwritten by "?"), and SADD for the replies. Batches of statuses are
+    read with MGET.
+    """
+
+    def __init__(self, client=None, **kwargs):
+        """Initialise Redis client by passing **kwargs to `redis.Redis`, or
+        use an existing `client`.
         """
-        yaml_dictionary = yaml.dump(dictionary)
-        self.redis.set(key, yaml_dictionary)
+        self.redis = client or redis.Redis(**kwargs)
 
-    def get(self, key):
-        """Retrieve a python dictionary from a YAML string in Redis. Note that 
-        YAML is used because it supports sets.
+    @staticmethod
+    def replies_key(key):
+        """Returns the key of the set of replies of a position key. Position
+        keys are a multiple of 4 bytes long, so these never collide.
         """
-        yaml_dictionary = self.redis.get(key)
-        return yaml.safe_load(yaml_dictionary) if yaml_dictionary else None
+        return key + b":r"
 
     def save(self, position, status, replies):
         """Redis implementation of BaseBackend method.
         """
-        key = position.name
-        existing = self.get(key) or {}
-        entry = {
-            **position.to_dict(),
-            "status": status,
-            "replies": existing.get("replies", set()).union(replies),
-        }
-        self.set(key, entry)
-    
+        key = position.key
+        pipe = self.redis.pipeline(transaction=False)
+        if status == "?":
+            pipe.setnx(key, status)
+        else:
+            pipe.set(key, status)
+        if replies:
+            pipe.sadd(self.replies_key(key), *replies)
+        pipe.execute()
+
     def get_status(self, position):
         """Redis implementation of BaseBackend method.
         """
-        key = position.name
-        existing = self.get(key) or {}
-        return existing.get("status", None)
+        status = self.redis.get(position.key)
+        return status.decode() if status else None
+
+    def get_statuses(self, positions):
+        """Redis implementation of BaseBackend method, with a single MGET.
+        """
+        if not positions:
+            return []
+        statuses = self.redis.mget([position.key for position in positions])
+        return [s.decode() if s else None for s in statuses]
+
+    def get_replies(self, position):
+        """Redis implementation of BaseBackend method.
+        """
+        replies = self.redis.smembers(self.replies_key(position.key))
+        return set(int(r) for r in replies)
+
+    def migrate(self):
+        """Convert entries stored by earlier versions, which were YAML
+        dictionaries under `Position.name` strings (e.g. "{9, 11}") or under
+        binary keys, to the status and reply set layout. Replies are merged
+        and P/N statuses are kept over "?".
+        """
+        import yaml
+        for old in self.redis.scan_iter():
+            # Reply keys are sets. Their b":r" suffix is not checked, since a
+            # binary position key can end with those bytes too
+            if self.redis.type(old) != b"string":
+                continue
+            value = self.redis.get(old)
+            if not value or len(value) == 1:
+                continue
+            entry = yaml.safe_load(value)
+            key = keys.from_name(old.decode()) if old.startswith(b"{") \
+                else old
+            pipe = self.redis.pipeline()
+            pipe.delete(old)
+            status = entry.get("status")
+            if status == "?":
+                pipe.setnx(key, status)
+            elif status:
+                pipe.set(key, status)
+            if entry.get("replies"):
+                pipe.sadd(self.replies_key(key), *entry["replies"])
+            pipe.execute()
@@ -0,0 +1,128 @@
+"""SQLite backend."""
+
+from .backend import BaseBackend
+
+import json
+import sqlite3
+import time
+
+
+class SQLiteBackend(BaseBackend):
+    """The `position`, `status` and `reply` tables of `PostgresBackend` in a
+    SQLite database, for single machine use without a database service.
+
+    The database runs in WAL mode and writes are committed in batches, by
+    the save that makes `batch_size` saves or comes `batch_ms` milliseconds
+    or more after the last commit. There is no timer, so an idle batch waits
+    for the next save. Reads on the same backend see uncommitted saves. Call
+    `commit` (or `close`) to make the last batch durable and visible to
+    other connections. Statements are fixed strings, so sqlite3 prepares each once
+    and reuses it from its statement cache.
+    """
+
+    POSITION = """
+        INSERT INTO position (key, name, generators, gcd, multiplicity,
+            genus, frobenius, irreducible)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+        ON CONFLICT (key) DO NOTHING;"""
+    STATUS = """
+        INSERT INTO status (position, status) VALUES (?, ?)
+        ON CONFLICT (position) DO UPDATE SET status = excluded.status
+        WHERE status.status != 'P' AND status.status != 'N';"""
+    REPLY = """
+        INSERT INTO reply (position, reply) VALUES (?, ?)
+        ON CONFLICT DO NOTHING;"""
+
+    def __init__(self, path, batch_size=10000, batch_ms=1000):
+        """Open (or create) the database at `path` and create the tables if
+        they do not yet exist.
+
+        Args:
+            path (str): Database file (":memory:" for a private in-memory
+                database).
+            batch_size (int): Commit after this many saves...
+            batch_ms (float): ...or on the first save this many
+                milliseconds after the last commit.
+        """
+        self.conn = sqlite3.connect(path)
+        self.conn.execute("PRAGMA journal_mode = WAL;")
+        self.conn.execute("PRAGMA synchronous = NORMAL;")
+        self.conn.executescript("""
+            CREATE TABLE IF NOT EXISTS position (
+                key             BLOB        PRIMARY KEY,
+                name            TEXT        NOT NULL,
+                generators      TEXT        NOT NULL,
+                gcd             INTEGER     NOT NULL,
+                multiplicity    INTEGER     NOT NULL,
+                genus           INTEGER     NOT NULL,
+                frobenius       INTEGER     NOT NULL,
+                irreducible     CHAR (1)    NULL
+            ) WITHOUT ROWID;
+            CREATE TABLE IF NOT EXISTS status (
+                position        BLOB        PRIMARY KEY,
+                status          VARCHAR (2) NOT NULL
+            ) WITHOUT ROWID;
+            CREATE TABLE IF NOT EXISTS reply (
+                position        BLOB        NOT NULL,
+                reply           INTEGER     NOT NULL,
+                PRIMARY KEY (position, reply)
+            ) WITHOUT ROWID;""")
+        self.batch_size = batch_size
+        self.batch_ms = batch_ms
+        self.pending = 0
+        self.last_commit = time.monotonic()
+
+    def save(self, position, status, replies):
+        """SQLite implementation of BaseBackend method.
+        """
+        key = position.key
+        d = position.to_dict()
+        c = self.conn
+        c.execute(self.POSITION, (key, d["name"],
+            json.dumps(d["generators"]), d["gcd"], d["multiplicity"],
+            d["genus"], d["frobenius"], d["irreducible"]))
+        c.execute(self.STATUS, (key, status))
+        if replies:
+            c.executemany(self.REPLY, [(key, r) for r in replies])
+        self.pending += 1
+        if self.pending >= self.batch_size or 1000 * (time.monotonic()
+                - self.last_commit) >= self.batch_ms:
+            self.commit()
+
+    def commit(self):
+        """Commit the saves of the current batch."""
+        self.conn.commit()
+        self.pending = 0
+        self.last_commit = time.monotonic()
+
+    def close(self):
+        self.commit()
+        self.conn.close()
+
+    def get_status(self, position):
+        """SQLite implementation of BaseBackend method.
+        """
+        row = self.conn.execute(
+            "SELECT status FROM status WHERE position = ?;",
+            (position.key,)).fetchone()
+        return row[0] if row else None
+
+    def get_statuses(self, positions):
+        """SQLite implementation of BaseBackend method, querying in chunks.
+        """
+        keys = [position.key for position in positions]
+        statuses = {}
+        # Stay well below SQLite's limit on the number of parameters
+        for i in range(0, len(keys), 500):
+            chunk = keys[i:i + 500]
+            query = "SELECT position, status FROM status WHERE position " \
+                f"IN ({','.join('?' * len(chunk))});"
+            statuses.update(self.conn.execute(query, chunk).fetchall())
+        return [statuses.get(k) for k in keys]
+
+    def get_replies(self, position):
+        """SQLite implementation of BaseBackend method.
+        """
+        rows = self.conn.execute(
+            "SELECT reply FROM reply WHERE position = ?;", (position.key,))
+        return set(r[0] for r in rows)
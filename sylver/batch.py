@@ -0,0 +1,238 @@
+"""Batched position kernel for evaluating many positions at once with NumPy.
+
+A `PositionBatch` holds N positions as the rows of a packed uint64 matrix
+(bit i of a row is set when i is a member) and computes moves, invariants and
+the `solve.quick` rules for all rows with vectorized operations.
+"""
+
+from .position import closure, multiples
+
+import numpy as np
+from sympy.ntheory.primetest import isprime
+
+# Number of set bits in every byte value
+_POPCOUNT = np.array([bin(i).count("1") for i in range(256)], dtype=np.int64)
+
+
+class PositionBatch():
+    """A batch of positions sharing a common bit length.
+
+    Attributes:
+        length (int): Number of bits per row.
+        bits (np.ndarray): (N, words) uint64 matrix of packed members.
+        gcd (np.ndarray): gcd of each row.
+        multiplicity (np.ndarray): Least positive member of each row.
+        single (np.ndarray): The generator of rows with exactly one generator,
+            otherwise 0.
+    """
+
+    def __init__(self, positions, length=None):
+        """Initialise from a list of `position.Position` objects. Rows are
+        filled from the generators at the common `length` (by default the
+        longest position length).
+        """
+        self.length = length or max(p.length for p in positions)
+        rows = []
+        for p in positions:
+            bits = 1
+            for g in p.generators:
+                bits = closure(bits, g, self.length)
+            rows.append(_pack(bits, self.words))
+        self.bits = np.array(rows, dtype=np.uint64).reshape(-1, self.words)
+        self.gcd = np.array([p.gcd for p in positions], dtype=np.int64)
+        self.multiplicity = np.array([p.multiplicity for p in positions],
+            dtype=np.int64)
+        self.single = np.array([p.generators[0] if len(p.generators) == 1
+            else 0 for p in positions], dtype=np.int64)
+        self._cache = {}
+
+    @classmethod
+    def children(cls, position, reverse=False):
+        """Returns the gaps of a position and the batch of its children, i.e.
+        every legal move applied to a copy of the position.
+        """
+        _, gaps, batch = cls([position]).expand(reverse=reverse)
+        return gaps, batch
+
+    def expand(self, reverse=False):
+        """Expand a frontier: returns (rows, gaps, batch) where batch holds the
+        child of row rows[i] after the move gaps[i], for every gap of every
+        row. The gaps are found by unpacking all rows at once.
+        """
+        members = np.unpackbits(self.bits.view(np.uint8), axis=1,
+            count=self.length, bitorder="little")
+        if reverse:
+            rows, gaps = np.nonzero(members[:, ::-1] == 0)
+            gaps = self.length - 1 - gaps
+        else:
+            rows, gaps = np.nonzero(members == 0)
+        return rows, gaps, self.take(rows).add(gaps)
+
+    @property
+    def words(self):
+        return (self.length + 63) // 64
+
+    def __len__(self):
+        return len(self.bits)
+
+    def take(self, rows):
+        """Returns a new batch made of the given rows (which may repeat)."""
+        batch = PositionBatch.__new__(PositionBatch)
+        batch.length = self.length
+        batch.bits = self.bits[rows]
+        batch.gcd = self.gcd[rows]
+        batch.multiplicity = self.multiplicity[rows]
+        batch.single = self.single[rows]
+        batch._cache = {}
+        return batch
+
+    def row(self, i):
+        """Returns the members of row i as an integer bit set."""
+        return int.from_bytes(self.bits[i].astype("<u8").tobytes(), "little")
+
+    def contains(self, n):
+        """Returns whether n[i] is a member of row i."""
+        n = np.asarray(n, dtype=np.int64)
+        words = np.take_along_axis(self.bits, (n // 64)[:, None], axis=1)[:, 0]
+        return ((words >> (n % 64).astype(np.uint64)) & np.uint64(1)) == 1
+
+    def add(self, moves):
+        """Add moves[i] to row i for all rows and return the new batch. The
+        closure uses the same shift doubling as `position.closure`, with a
+        per row shift. Rows whose move is already a member are unchanged.
+        """
+        moves = np.asarray(moves, dtype=np.int64)
+        if len(moves) and moves.max() >= self.length:
+            raise IndexError("Moves must be less than the batch length")
+        legal = ~self.contains(moves)
+        batch = self.take(np.arange(len(self)))
+        shift = moves.copy()
+        active = legal & (shift < self.length)
+        while active.any():
+            rows = batch.bits[active]
+            batch.bits[active] = rows | _shift_left(rows, shift[active])
+            shift = shift << 1
+            active &= shift < self.length
+        batch.bits[:, -1] &= _last_word_mask(self.length)
+        batch.gcd = np.where(legal, np.gcd(self.gcd, moves), self.gcd)
+        batch.multiplicity = np.where(legal,
+            np.minimum(self.multiplicity, moves), self.multiplicity)
+        # A move dividing every generator (the gcd) becomes the only one
+        batch.single = np.where(legal, np.where(batch.gcd == moves, moves, 0),
+            self.single)
+        return batch
+
+    def reduced_gaps(self):
+        """Returns the (N, words) matrix of gaps of the reduced semigroups,
+        i.e. the non-members that are multiples of the gcd.
+        """
+        if "gaps" not in self._cache:
+            if (self.gcd == 1).all():
+                gaps = ~self.bits
+                gaps[:, -1] &= _last_word_mask(self.length)
+            else:
+                values, inverse = np.unique(self.gcd, return_inverse=True)
+                masks = np.array([_pack(multiples(int(d), self.length),
+                    self.words) for d in values], dtype=np.uint64)
+                gaps = ~self.bits & masks.reshape(-1, self.words)[
+                    inverse.reshape(-1)]
+            self._cache["gaps"] = gaps
+        return self._cache["gaps"]
+
+    def genus(self):
+        """Returns the genus of each row."""
+        if "genus" not in self._cache:
+            gaps = self.reduced_gaps()
+            self._cache["genus"] = _popcount(gaps).sum(axis=1)
+        return self._cache["genus"]
+
+    def frobenius(self):
+        """Returns the frobenius number of each row (0 if there are no
+        gaps)."""
+        if "frobenius" not in self._cache:
+            gaps = self.reduced_gaps()
+            nonzero = gaps != 0
+            last = self.words - 1 - np.argmax(nonzero[:, ::-1], axis=1)
+            top = gaps[np.arange(len(self)), last]
+            frobenius = 64 * last + _bit_length(top) - 1
+            self._cache["frobenius"] = np.where(nonzero.any(axis=1),
+                frobenius, 0)
+        return self._cache["frobenius"]
+
+    def irreducible(self):
+        """Returns the irreducible type of each row as a string array of "s",
+        "p" or "" (not irreducible), as for `Position.irreducible`.
+        """
+        reduced_frob = self.frobenius() // self.gcd
+        genus = self.genus()
+        irreducible = np.full(len(self), "", dtype="<U1")
+        antisymmetric = genus == reduced_frob // 2 + 1
+        irreducible[antisymmetric & (reduced_frob % 2 == 1)] = "s"
+        irreducible[antisymmetric & (reduced_frob % 2 == 0)] = "p"
+        irreducible[genus == 0] = "p"
+        return irreducible
+
+    def valid(self):
+        """Returns whether each row's length is sufficient, i.e. the last
+        min(generators) / gcd entries of the reduced array are all members
+        (see `Position`).
+        """
+        gaps = self.reduced_gaps()
+        reduced_frob = self.frobenius() // self.gcd
+        reduced_length = (self.length + self.gcd - 1) // self.gcd
+        return ~gaps.any(axis=1) \
+            | (reduced_frob < reduced_length - self.multiplicity // self.gcd)
+
+    def quick(self):
+        """The `solve.quick` rules for every row. Returns a string array of
+        "N" (irreducible enders other than {2, 3}), "P" (single primes
+        greater than 3) or "" (unknown).
+        """
+        status = np.full(len(self), "", dtype="<U1")
+        frobenius = self.frobenius()
+        two_three = (self.multiplicity == 2) & (frobenius == 1)
+        ender = (self.gcd == 1) & (self.irreducible() != "") & ~two_three
+        status[ender] = "N"
+        singles = np.unique(self.single[self.single > 3])
+        primes = [s for s in singles if isprime(int(s))]
+        status[np.isin(self.single, primes)] = "P"
+        return status
+
+def _popcount(words):
+    """Vectorized popcount of uint64 arrays."""
+    if hasattr(np, "bitwise_count"):
+        return np.bitwise_count(words).astype(np.int64)
+    counts = _POPCOUNT[words.view(np.uint8)]
+    return counts.reshape(words.shape + (8,)).sum(axis=-1)
+
+def _pack(bits, words):
+    """Pack an integer bit set into a little-endian uint64 row."""
+    return np.frombuffer(bits.to_bytes(8 * words, "little"), dtype="<u8")
+
+def _last_word_mask(length):
+    bits = length % 64
+    return np.uint64((1 << bits) - 1 if bits else (1 << 64) - 1)
+
+def _shift_left(rows, shift):
+    """Shift each packed row left (towards higher bits) by its own amount.
+    Word j of the result takes the low bits of source word j - q and the high
+    bits of source word j - q - 1, which is the previous gathered column.
+    """
+    index = np.arange(rows.shape[1])[None, :] - (shift // 64)[:, None]
+    bit = (shift % 64).astype(np.uint64)[:, None]
+    source = np.take_along_axis(rows, np.clip(index, 0, None), axis=1)
+    source[index < 0] = 0
+    previous = np.zeros_like(source)
+    previous[:, 1:] = source[:, :-1]
+    carry = np.where(bit > 0, previous >> ((np.uint64(64) - bit) % 64), 0)
+    return (source << bit) | carry.astype(np.uint64)
+
+def _bit_length(words):
+    """Vectorized int.bit_length for uint64 arrays."""
+    words = words.copy()
+    length = np.zeros(words.shape, dtype=np.int64)
+    for step in (32, 16, 8, 4, 2, 1):
+        big = (words >> np.uint64(step)) != 0
+        length += big * step
+        words = np.where(big, words >> np.uint64(step), words)
+    return length + (words != 0)
@@ -0,0 +1,128 @@
+"""Non-recursive, resumable solver."""
+
+from .backend import MemoryBackend
+from .known import KNOWN
+from .solve import Node
+
+import json
+import os
+
+
+class Solver():
+    """Explicit stack solver with the same semantics as `solve.solve` (P/N/?,
+    `deep`, `reverse`, backend saves), but without recursion, so it is not
+    limited by the Python recursion limit. The search state is a stack of
+    plain data `solve.Node` states, so a search can be paused (`run` with
+    `max_nodes`), checkpointed to disk and resumed later, e.g. after a worker
+    restart. Results of finished subtrees live in the backend, so a
+    persistent backend avoids redoing them after a restart.
+    """
+
+    def __init__(self, position, backend=None, reverse=False, deep=False,
+            verbose=False, order=None, prune=None, known=KNOWN, stats=None):
+        """
+        Args:
+            position (Position): The position to solve.
+            backend, reverse, deep, verbose, order, prune, known: As for
+                `solve.solve`.
+            stats (instrument.SolveStats): Optional statistics to record
+                every node in.
+        """
+        self.backend = backend or MemoryBackend()
+        self.reverse = reverse
+        self.deep = deep
+        self.verbose = verbose
+        self.order = order
+        self.prune = prune
+        self.known = known
+        self.stats = stats
+        self.stack = [Node(position, self.backend, reverse=reverse,
+            order=order, known=known, deep=deep)]
+        if stats:
+            stats.enter(self.stack[0])
+        self.nodes = 1
+        self.result = None
+
+    @property
+    def done(self):
+        return self.result is not None
+
+    def run(self, max_nodes=None):
+        """Search until the position is solved, or until `max_nodes` more
+        nodes have been visited.
+
+        Returns:
+            status (str): The status ("P", "N" or "?"), or None if paused.
+        """
+        stack = self.stack
+        visited = 0
+        while stack:
+            node = stack[-1]
+            if not node.done and max_nodes is not None \
+                    and visited >= max_nodes:
+                return None
+            move = None if node.done else node.next_child()
+            if move is None:
+                status = node.finish(self.backend, verbose=self.verbose)
+                stack.pop()
+                if self.stats:
+                    self.stats.leave(node, status)
+                if stack:
+                    stack[-1].update(stack[-1].gap, status, deep=self.deep,
+                        order=self.order, prune=self.prune,
+                        child=node.position, backend=self.backend)
+                else:
+                    self.result = status
+                continue
+            stack.append(Node(move[1], self.backend, reverse=self.reverse,
+                order=self.order, known=self.known, deep=self.deep))
+            if self.stats:
+                self.stats.enter(stack[-1])
+            visited += 1
+            self.nodes += 1
+        return self.result
+
+    def to_dict(self):
+        """Returns the search state as plain (JSON serialisable) data."""
+        return {
+            "reverse": self.reverse,
+            "deep": self.deep,
+            "nodes": self.nodes,
+            "result": self.result,
+            "stack": [node.to_dict() for node in self.stack],
+        }
+
+    @classmethod
+    def from_dict(cls, state, backend=None, verbose=False, order=None,
+            prune=None, known=KNOWN):
+        """Restore a solver from `to_dict` state. The ordering's own state
+        (e.g. history tables) is not part of the checkpoint.
+        """
+        solver = cls.__new__(cls)
+        solver.backend = backend or MemoryBackend()
+        solver.reverse = state["reverse"]
+        solver.deep = state["deep"]
+        solver.verbose = verbose
+        solver.order = order
+        solver.prune = prune
+        solver.known = known
+        solver.stats = None
+        solver.nodes = state["nodes"]
+        solver.result = state["result"]
+        solver.stack = [Node.from_dict(node) for node in state["stack"]]
+        return solver
+
+    def checkpoint(self, path):
+        """Write the search state to a JSON file (atomically)."""
+        tmp = f"{path}.tmp"
+        with open(tmp, "w") as f:
+            json.dump(self.to_dict(), f)
+        os.replace(tmp, path)
+
+    @classmethod
+    def resume(cls, path, backend=None, verbose=False, order=None,
+            prune=None, known=KNOWN):
+        """Load a solver from a checkpoint file written by `checkpoint`."""
+        with open(path) as f:
+            return cls.from_dict(json.load(f), backend=backend,
+                verbose=verbose, order=order, prune=prune, known=known)
@@ -0,0 +1,211 @@
+"""Solver instrumentation.
+
+`solve` runs an `engine.Solver` that records every node in a `SolveStats`
+and returns the statistics alongside the status: nodes visited, nodes
+decided without a search (by `quick` rule, known table, backend or
+precheck), backend hits, misses and latency, children skipped for
+insufficient length, nodes and time per depth and per kind (gcd = 1, short
+and long gcd > 1), and the largest subtrees. Optionally it reports progress
+snapshots, times `Position.child` (which `Position.add` uses) and
+`solve.quick_rule` with perf counters, and runs the solve under cProfile.
+"""
+
+from . import solve as solver
+from .backend import MemoryBackend
+from .backend.backend import BaseBackend
+from .engine import Solver
+from .position import Position
+
+from collections import Counter, defaultdict
+import contextlib
+import cProfile
+import heapq
+import pstats
+import time
+
+
+class SolveStats():
+    """Statistics of a solve, filled in by `engine.Solver` via `enter` and
+    `leave`. Times are wall clock seconds: per depth they include the
+    subtrees, per kind they are the time spent in the nodes themselves.
+    """
+
+    def __init__(self, progress=None, every=10000, largest=10):
+        """
+        Args:
+            progress (callable): Called with a `snapshot` dict every
+                `every` nodes.
+            largest (int): Number of largest subtrees to keep.
+        """
+        self.progress = progress
+        self.every = every
+        self.n_largest = largest
+        self.start = time.perf_counter()
+        self.elapsed = 0.0
+        self.nodes = 0
+        self.sources = Counter()
+        self.length_errors = 0
+        self.depths = defaultdict(lambda: [0, 0.0])
+        self.kinds = defaultdict(lambda: [0, 0.0])
+        self.backend = {"calls": 0, "seconds": 0.0, "hits": 0, "misses": 0}
+        self.timers = defaultdict(lambda: [0, 0.0])
+        self.largest = []
+        self.profile = None
+        # Per open node: [start time, time in children, subtree nodes]
+        self.stack = []
+
+    def enter(self, node):
+        """Record a node that has been created (and maybe decided)."""
+        self.nodes += 1
+        if node.source:
+            self.sources[node.source] += 1
+        self.stack.append([time.perf_counter(), 0.0, 1])
+        if self.progress and self.nodes % self.every == 0:
+            self.progress(self.snapshot())
+
+    def leave(self, node, status):
+        """Record a node that has been finished with `status`."""
+        start, children, subtree = self.stack.pop()
+        elapsed = time.perf_counter() - start
+        depth = self.depths[len(self.stack)]
+        depth[0] += 1
+        depth[1] += elapsed
+        kind = self.kinds[node.kind or "decided"]
+        kind[0] += 1
+        kind[1] += elapsed - children
+        self.length_errors += node.length_errors
+        if self.stack:
+            self.stack[-1][1] += elapsed
+            self.stack[-1][2] += subtree
+        if subtree > 1:
+            item = (subtree, node.position.name, status)
+            if len(self.largest) < self.n_largest:
+                heapq.heappush(self.largest, item)
+            else:
+                heapq.heappushpop(self.largest, item)
+        self.elapsed = time.perf_counter() - self.start
+
+    def snapshot(self):
+        """Returns the progress so far: elapsed time, nodes, nodes per
+        second, the current depth and the nodes decided without a search.
+        """
+        elapsed = time.perf_counter() - self.start
+        return {
+            "elapsed": elapsed,
+            "nodes": self.nodes,
+            "nodes_per_second": self.nodes / elapsed if elapsed else 0.0,
+            "depth": len(self.stack),
+            "sources": dict(self.sources),
+        }
+
+    def to_dict(self):
+        """Returns all statistics as plain (JSON serialisable) data."""
+        calls = self.backend["calls"]
+        return {
+            "elapsed": self.elapsed,
+            "nodes": self.nodes,
+            "nodes_per_second": self.nodes / self.elapsed
+                if self.elapsed else 0.0,
+            "sources": dict(self.sources),
+            "length_errors": self.length_errors,
+            "backend": {**self.backend, "latency": self.backend["seconds"]
+                / calls if calls else 0.0},
+            "depths": {d: {"nodes": n, "seconds": t}
+                for d, (n, t) in sorted(self.depths.items())},
+            "kinds": {k: {"nodes": n, "seconds": t}
+                for k, (n, t) in self.kinds.items()},
+            "timers": {name: {"calls": n, "seconds": t}
+                for name, (n, t) in self.timers.items()},
+            "largest": [{"position": name, "nodes": n, "status": status}
+                for n, name, status in sorted(self.largest, reverse=True)],
+        }
+
+class TimedBackend(BaseBackend):
+    """Backend wrapper counting the calls, time, hits and misses of another
+    backend in a `SolveStats`.
+    """
+
+    def __init__(self, backend, stats):
+        self.backend = backend
+        self.stats = stats
+
+    def _call(self, method, *args):
+        start = time.perf_counter()
+        result = getattr(self.backend, method)(*args)
+        self.stats.backend["calls"] += 1
+        self.stats.backend["seconds"] += time.perf_counter() - start
+        return result
+
+    def _count(self, statuses):
+        for status in statuses:
+            self.stats.backend["hits" if status else "misses"] += 1
+
+    def save(self, position, status, replies):
+        self._call("save", position, status, replies)
+
+    def get_status(self, position):
+        status = self._call("get_status", position)
+        self._count([status])
+        return status
+
+    def get_statuses(self, positions):
+        statuses = self._call("get_statuses", positions)
+        self._count(statuses)
+        return statuses
+
+    def get_replies(self, position):
+        return self._call("get_replies", position)
+
+@contextlib.contextmanager
+def _timers(stats):
+    """Time `Position.child` and `solve.quick_rule` with perf counters
+    while solving.
+    """
+    def timed(name, f):
+        timer = stats.timers[name]
+        def wrapper(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return f(*args, **kwargs)
+            finally:
+                timer[0] += 1
+                timer[1] += time.perf_counter() - start
+        return wrapper
+    child, quick_rule = Position.child, solver.quick_rule
+    Position.child = timed("Position.child", child)
+    solver.quick_rule = timed("quick", quick_rule)
+    try:
+        yield
+    finally:
+        Position.child, solver.quick_rule = child, quick_rule
+
+def solve(position, backend=None, progress=None, every=10000, largest=10,
+        timers=False, profile=False, **kwargs):
+    """Solve a position with `engine.Solver` while recording statistics.
+
+    Args:
+        `backend`: As for `solve.solve`. Its calls are counted and timed.
+        `progress`, `every`, `largest`: See `SolveStats`.
+        `timers`: Time `Position.child` and `quick` with perf counters.
+        `profile`: Run under cProfile, keeping a `pstats.Stats` in the
+            `profile` attribute of the statistics.
+        Further keyword arguments are passed to `engine.Solver`.
+
+    Returns:
+        (status, SolveStats)
+    """
+    stats = SolveStats(progress=progress, every=every, largest=largest)
+    backend = TimedBackend(backend or MemoryBackend(), stats)
+    profiler = cProfile.Profile() if profile else None
+    with _timers(stats) if timers else contextlib.nullcontext():
+        if profiler:
+            profiler.enable()
+        try:
+            status = Solver(position, backend=backend, stats=stats,
+                **kwargs).run()
+        finally:
+            if profiler:
+                profiler.disable()
+    if profiler:
+        stats.profile = pstats.Stats(profiler)
+    return status, stats
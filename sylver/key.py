@@ -0,0 +1,28 @@
+"""Canonical compact position keys.
+
+A key is the sorted minimal generators of a position packed as fixed-width
+big-endian unsigned 32 bit integers. Keys are unique per position, cheap to
+hash, and sort in the same order as the generator lists. Big-endian matches
+PostgreSQL's `int4send`, so keys can also be computed in SQL.
+"""
+
+import struct
+
+
+def encode(generators):
+    """Returns the key for a sorted list of minimal generators."""
+    return struct.pack(f">{len(generators)}I", *generators)
+
+def decode(key):
+    """Returns the list of generators encoded in a key."""
+    return list(struct.unpack(f">{len(key) // 4}I", key))
+
+def from_name(name):
+    """Returns the key for a position name such as "{9, 11}". This is the
+    migration path for data stored under `Position.name`.
+    """
+    return encode(sorted(int(g) for g in name.strip("{} ").split(",")))
+
+def to_name(key):
+    """Returns the position name for a key."""
+    return "{{{}}}".format(", ".join(str(g) for g in decode(key)))
@@ -0,0 +1,71 @@
+"""Table of known P-positions.
+
+The table is seeded from the `safe` lists and `canned1` single number
+replies of Sicherman's `scripts/sylver.py`. These are P-positions of the game
+itself (whatever the bit length of a `Position`), so positions with a move
+into the table are N without a search. Tables can be extended with `add` and
+stored as text files with one position name (e.g. "{8, 10, 22}") per line.
+"""
+
+from .apery import AperyPosition
+from . import key as keys
+
+# Long P-positions from Sicherman's `safe` lists (by gcd 2, 3 and 4)
+SAFE = [
+    [4, 6], [8, 10, 22], [8, 10, 12, 14], [8, 12, 18, 22], [8, 12, 26, 30],
+    [8, 12, 34, 38], [8, 12, 42, 46], [8, 12, 50, 54],
+    [6, 9], [12, 15, 18], [12, 18, 21],
+    [8, 12],
+]
+
+# Winning replies to single numbers from Sicherman's `canned1`
+CANNED = {2: [3], 3: [2], 4: [6], 6: [4, 9], 8: [12], 10: [5, 14, 26]}
+
+
+class KnownPositions():
+    """A set of known P-positions, stored by key."""
+
+    def __init__(self, positions=()):
+        """
+        Args:
+            positions: Positions, or lists of seeds, to add.
+        """
+        self.keys = set()
+        for position in positions:
+            self.add(position)
+
+    def __len__(self):
+        return len(self.keys)
+
+    def __contains__(self, position):
+        return position.key in self.keys
+
+    def add(self, position):
+        """Add a position (or a list of seeds) to the table."""
+        seeds = getattr(position, "generators", position)
+        self.keys.add(AperyPosition(seeds).key)
+
+    def load(self, path):
+        """Add the positions in a text file, one position per line as a name
+        such as "{8, 10, 22}" or integers separated by spaces or commas.
+        Blank lines and lines starting with # are ignored.
+        """
+        with open(path) as f:
+            for line in f:
+                line = line.strip().strip("{}")
+                if line and not line.startswith("#"):
+                    self.add([int(s) for s in line.replace(",", " ").split()])
+        return self
+
+    def save(self, path):
+        """Write the table to a text file readable by `load`."""
+        with open(path, "w") as f:
+            f.writelines(f"{keys.to_name(k)}\n" for k in sorted(self.keys))
+
+def default():
+    """Returns a new table seeded with `SAFE` and `CANNED`."""
+    return KnownPositions(SAFE + [[n, reply] for n, replies in CANNED.items()
+        for reply in replies])
+
+# The table used by `solve.solve` unless another is given
+KNOWN = default()
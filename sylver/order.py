@@ -0,0 +1,101 @@
+"""Move ordering heuristics for `solve.solve`.
+
+The solver stops at the first P child, so the sooner a winning reply is
+tried the fewer nodes are searched. An ordering receives the gaps of a
+position (ascending, or descending when solving in reverse) and returns them
+in the order to try. Orderings can be stacked: each one reorders the output
+of its `base`, and ties keep the base order.
+"""
+
+from .error import LengthError
+from .known import KNOWN
+
+from collections import defaultdict
+
+
+class Ordering():
+    """Default ordering: the gaps in the order given."""
+
+    def __init__(self, base=None):
+        self.base = base
+
+    def order(self, position, gaps, backend):
+        """Returns the gaps of `position` in the order to try."""
+        if self.base:
+            return self.base.order(position, gaps, backend)
+        return gaps
+
+    def update(self, position, gap, status):
+        """Called with the `status` of each child solved, i.e. `position`
+        after the move `gap`.
+        """
+        if self.base:
+            self.base.update(position, gap, status)
+
+class History(Ordering):
+    """Killer move and history heuristic. Moves which led to P children are
+    counted per (multiplicity, move). Within positions of the same
+    multiplicity the most recent winning move (the killer) is tried first,
+    then the moves that have won most often.
+    """
+
+    def __init__(self, base=None):
+        super().__init__(base)
+        self.history = defaultdict(int)
+        self.killers = {}
+
+    def order(self, position, gaps, backend):
+        gaps = super().order(position, gaps, backend)
+        m = position.multiplicity
+        killer = self.killers.get(m)
+        return sorted(gaps,
+            key=lambda g: (g != killer, -self.history.get((m, g), 0)))
+
+    def update(self, position, gap, status):
+        super().update(position, gap, status)
+        if status == "P":
+            self.history[(position.multiplicity, gap)] += 1
+            self.killers[position.multiplicity] = gap
+
+class KnownReplies(Ordering):
+    """Try the replies already recorded for the position in the backend
+    first, e.g. from earlier (partial) solves.
+    """
+
+    def order(self, position, gaps, backend):
+        gaps = super().order(position, gaps, backend)
+        known = backend.get_replies(position)
+        return [g for g in gaps if g in known] \
+            + [g for g in gaps if g not in known]
+
+class InstantWinner(Ordering):
+    """Sicherman's instant winner check: moves whose resulting position is
+    already known to be P, in the `known` table or the backend, are tried
+    first. The backend is asked about all the children in one batch.
+    """
+
+    def __init__(self, base=None, known=KNOWN):
+        super().__init__(base)
+        self.known = known
+
+    def order(self, position, gaps, backend):
+        gaps = super().order(position, gaps, backend)
+        children = {}
+        for gap in gaps:
+            try:
+                children[gap] = position.child(gap)
+            except LengthError:
+                pass
+        statuses = backend.get_statuses(list(children.values()))
+        winners = [gap for (gap, child), status in zip(children.items(),
+            statuses) if status == "P"
+            or self.known is not None and child in self.known]
+        instant = set(winners)
+        return winners + [g for g in gaps if g not in instant]
+
+ORDERINGS = {
+    "default": Ordering,
+    "history": History,
+    "known": lambda: KnownReplies(History()),
+    "instant": lambda: InstantWinner(History()),
+}
@@ -0,0 +1,383 @@
+"""Multi-process solver with a shared transposition table.
+
+The game tree is split near the root: the root's children (and, while there
+are too few of them to keep every process busy, their children in turn) are
+expanded in the parent process, and the remaining subtrees are solved by a
+process pool with `engine.Solver`. Results are combined back up the split
+tree with the same semantics as `solve.solve`. Once a split node is decided,
+e.g. a winning reply is found, the subtrees below it are cancelled.
+
+Workers share statuses through a `SharedTable` so a P/N position found by
+one worker is seen by the others right away. Every save of a worker is sent
+back with its result and saved to the caller's backend by the parent
+process, so a parallel solve stores the same positions as a serial one.
+
+While processes are idle, e.g. when one large subtree is left, running
+tasks are asked to stop and their nodes are split one level further, the
+children becoming new tasks. The subtrees they already decided are not
+lost: they are in the shared table and the parent's backend.
+"""
+
+from .backend import MemoryBackend
+from .backend.backend import STATUS_CODES, STATUSES, BaseBackend
+from .engine import Solver
+from .error import LengthError
+from .known import KNOWN
+from .solve import Node
+
+from collections import deque
+import ctypes
+import hashlib
+import multiprocessing
+import os
+import queue
+
+
+class SharedTable():
+    """Lock-free transposition table of P/N statuses in shared memory.
+
+    An open addressing table of `size` 64-bit slots. Each slot holds a 62-bit
+    fingerprint of the position key and the status code in the low 2 bits,
+    so every write is a single aligned 8-byte store and readers never see a
+    torn record. Concurrent writers may overwrite each other's entries,
+    which only costs a recomputation. Distinct keys share a fingerprint with
+    probability about 2^-62.
+    """
+
+    # Slots probed per lookup before giving up (or replacing on save)
+    PROBES = 8
+
+    def __init__(self, size=1 << 22, array=None):
+        """
+        Args:
+            size (int): Number of slots (rounded up to a power of 2).
+            array (multiprocessing.RawArray): Attach to an existing table,
+                e.g. in a worker process.
+        """
+        if array is None:
+            size = 1 << max(size - 1, 1).bit_length()
+            array = multiprocessing.RawArray(ctypes.c_uint64, size)
+        self.array = array
+        self.size = len(array)
+        self.slots = memoryview(array).cast("B").cast("Q")
+
+    def _probe(self, key):
+        digest = hashlib.blake2b(key, digest_size=8).digest()
+        tag = int.from_bytes(digest, "little") & ~3 or 4
+        start = tag >> 2
+        return tag, [(start + i) & (self.size - 1) for i in range(self.PROBES)]
+
+    def get(self, key):
+        """Returns the status stored for a key, or None."""
+        tag, slots = self._probe(key)
+        for i in slots:
+            word = self.slots[i]
+            if not word:
+                return None
+            if word & ~3 == tag:
+                return STATUSES[word & 3]
+        return None
+
+    def put(self, key, status):
+        """Store the status of a key, replacing an entry if the probed slots
+        are all taken.
+        """
+        tag, slots = self._probe(key)
+        for i in slots:
+            word = self.slots[i]
+            if not word or word & ~3 == tag:
+                break
+        else:
+            i = slots[0]
+        self.slots[i] = tag | STATUS_CODES[status]
+
+class SharedBackend(BaseBackend):
+    """Backend of a worker process: P/N statuses go to the `SharedTable`,
+    everything is also kept in a local backend (which provides replies) and
+    in `saved`, to be sent back to the parent process (see `collect`).
+    """
+
+    def __init__(self, table, backend=None):
+        self.table = table
+        self.backend = backend or MemoryBackend()
+        self.saved = []
+
+    def save(self, position, status, replies):
+        self.backend.save(position, status, replies)
+        self.saved.append((position, status, list(replies)))
+        if status in ["P", "N"]:
+            self.table.put(position.key, status)
+
+    def collect(self):
+        """Returns the (position, status, replies) saves since the last
+        call.
+        """
+        saved, self.saved = self.saved, []
+        return saved
+
+    def get_status(self, position):
+        return self.table.get(position.key) \
+            or self.backend.get_status(position)
+
+    def get_replies(self, position):
+        return self.backend.get_replies(position)
+
+class _Split():
+    """A node of the split tree expanded in the parent process."""
+
+    __slots__ = ("node", "parent", "gap", "pending", "expanded", "done",
+        "error", "ancestors")
+
+    def __init__(self, node, parent=None, gap=None, ancestors=()):
+        self.node = node
+        self.parent = parent
+        self.gap = gap
+        self.pending = 0
+        self.expanded = False
+        self.done = False
+        self.error = None
+        self.ancestors = ancestors
+
+class ParallelSolver():
+    """See `solve`."""
+
+    def __init__(self, position, processes=None, backend=None,
+            reverse=False, deep=False, verbose=False, tasks_per_process=4,
+            max_split=3, table_size=1 << 22, slice_nodes=1000, known=KNOWN,
+            max_splits=1 << 16):
+        self.processes = processes or os.cpu_count()
+        self.backend = backend or MemoryBackend()
+        self.reverse = reverse
+        self.deep = deep
+        self.verbose = verbose
+        self.tasks_per_process = tasks_per_process
+        self.max_split = max_split
+        self.table = SharedTable(table_size)
+        self.slice_nodes = slice_nodes
+        self.known = known
+        self.max_splits = max_splits
+        self.splits = [_Split(Node(position, self.backend, reverse=reverse,
+            known=known, deep=deep), ancestors=(0,))]
+        self.cancel = None
+        self.resplit = None
+        # Ids of the leaves waiting for a process, and of the tasks
+        # submitted and not yet returned (oldest first)
+        self.backlog = deque()
+        self.running = {}
+        self.resplits = 0
+        self.result = None
+
+    def run(self):
+        leaves = self._expand()
+        if self.result is not None:
+            return self.result
+        # Flags per split id, with room for the splits made while running
+        size = max(self.max_splits, len(self.splits))
+        self.cancel = multiprocessing.RawArray(ctypes.c_byte, size)
+        self.resplit = multiprocessing.RawArray(ctypes.c_byte, size)
+        for i, split in enumerate(self.splits):
+            self.cancel[i] = split.done
+        results = queue.SimpleQueue()
+        pool = multiprocessing.Pool(self.processes, initializer=_init_worker,
+            initargs=(self.table.array, self.cancel, self.resplit,
+            self.reverse, self.deep, self.slice_nodes, self.known))
+        def submit():
+            # At most one task per process is handed to the pool, so the
+            # rest can be skipped once cancelled
+            while self.backlog and len(self.running) < self.processes:
+                i = self.backlog.popleft()
+                if self._cancelled(i):
+                    continue
+                split = self.splits[i]
+                self.running[i] = None
+                pool.apply_async(_solve_task, ((i, split.node.position,
+                    split.ancestors),), callback=results.put,
+                    error_callback=results.put)
+            self._request_splits()
+        try:
+            self.backlog.extend(leaves)
+            submit()
+            while self.running and self.result is None:
+                result = results.get()
+                if isinstance(result, BaseException):
+                    raise result
+                i, status, saved = result
+                del self.running[i]
+                for position, saved_status, replies in saved:
+                    self.backend.save(position, saved_status, replies)
+                if isinstance(status, LengthError):
+                    self._fail(i, status)
+                elif status is not None:
+                    self._report(i, status)
+                elif self.resplit[i] and not self._cancelled(i):
+                    self.resplits += 1
+                    self.backlog.extend(self._expand_split(i))
+                submit()
+        finally:
+            # Cancelling the root stops every task within a slice. Workers
+            # are not terminated: one killed while sending a result leaves
+            # the pool's result queue locked, and terminate() hangs
+            self.cancel[0] = 1
+            pool.close()
+            pool.join()
+        return self.result
+
+    def _expand(self):
+        """Expand the split tree breadth first until there are enough
+        subtrees for the pool. Returns the ids of the unsolved leaves.
+        """
+        leaves = [0]
+        for _ in range(self.max_split):
+            if len(leaves) >= self.tasks_per_process * self.processes:
+                break
+            expanded = []
+            for i in leaves:
+                if not self._cancelled(i):
+                    expanded.extend(self._expand_split(i))
+            leaves = expanded
+        return [i for i in leaves if not self._cancelled(i)]
+
+    def _request_splits(self):
+        """Ask the oldest running tasks to stop and be split further, one
+        per idle process, while there is room for their children.
+        """
+        if self.backlog:
+            return
+        idle = self.processes - len(self.running) \
+            - sum(self.resplit[i] for i in self.running)
+        for i in self.running:
+            if idle <= 0:
+                break
+            if self.resplit[i] or len(self.splits) \
+                    + len(self.splits[i].node.gaps) > len(self.resplit):
+                continue
+            self.resplit[i] = 1
+            idle -= 1
+
+    def _expand_split(self, i):
+        """Create the child nodes of split i. Children with a known status
+        are reported straight away. Returns the ids of the others.
+        """
+        split = self.splits[i]
+        children = []
+        while not split.done and not split.node.done:
+            try:
+                move = split.node.next_child()
+            except LengthError as e:
+                split.error = split.error or e
+                continue
+            if move is None:
+                break
+            gap, child = move
+            j = len(self.splits)
+            node = Node(child, self.backend, reverse=self.reverse,
+                known=self.known, deep=self.deep)
+            self.splits.append(_Split(node, parent=i, gap=gap,
+                ancestors=split.ancestors + (j,)))
+            split.pending += 1
+            if node.done:
+                self._report(j, node.finish(self.backend,
+                    verbose=self.verbose))
+            else:
+                children.append(j)
+        split.expanded = True
+        self._settle(i)
+        return children
+
+    def _cancelled(self, i):
+        return any(self.splits[a].done for a in self.splits[i].ancestors)
+
+    def _report(self, i, status):
+        """Record the status of split i and propagate it up the tree."""
+        split = self.splits[i]
+        split.done = True
+        if self.cancel is not None:
+            self.cancel[i] = 1
+        if split.parent is None:
+            self.result = status
+            return
+        parent = self.splits[split.parent]
+        if not parent.done:
+            parent.node.update(split.gap, status, deep=self.deep)
+            parent.pending -= 1
+            self._settle(split.parent)
+
+    def _fail(self, i, error):
+        """Record that solving split i raised a LengthError. As the search
+        is speculative, this is only raised if the parent needs the result.
+        """
+        split = self.splits[i]
+        split.done = True
+        if split.parent is None:
+            raise error
+        parent = self.splits[split.parent]
+        if not parent.done:
+            parent.error = parent.error or error
+            parent.pending -= 1
+            self._settle(split.parent)
+
+    def _settle(self, i):
+        """Finish split i if it is decided."""
+        split = self.splits[i]
+        won = split.node.status == "N" and not self.deep
+        if split.done or not (won or (split.expanded and not split.pending)):
+            return
+        if split.error and not won:
+            raise split.error
+        self._report(i, split.node.finish(self.backend,
+            verbose=self.verbose))
+
+def solve(position, processes=None, backend=None, reverse=False, deep=False,
+        verbose=False, **kwargs):
+    """Parallel version of `solve.solve`.
+
+    Args:
+        `processes`: Number of worker processes (by default the CPU count).
+        `backend`: Backend for every position decided, as for
+            `solve.solve`. The workers send their saves back with their
+            results and the parent process saves them.
+        `reverse`, `deep`, `verbose`, `known`: As for `solve.solve`.
+        `tasks_per_process`: Split the tree until there are at least this
+            many subtrees per process...
+        `max_split`: ...or the split tree has this depth.
+        `table_size`: Number of slots of the shared table (8 bytes each).
+        `slice_nodes`: Workers check for cancellation (or a request to
+            split) every this many nodes.
+        `max_splits`: Stop splitting running tasks once the split tree has
+            this many nodes.
+    """
+    return ParallelSolver(position, processes=processes, backend=backend,
+        reverse=reverse, deep=deep, verbose=verbose, **kwargs).run()
+
+# Worker process state, set by `_init_worker`
+_worker = {}
+
+def _init_worker(array, cancel, resplit, reverse, deep, slice_nodes, known):
+    _worker["backend"] = SharedBackend(SharedTable(array=array))
+    _worker["cancel"] = cancel
+    _worker["resplit"] = resplit
+    _worker["reverse"] = reverse
+    _worker["deep"] = deep
+    _worker["slice_nodes"] = slice_nodes
+    _worker["known"] = known
+
+def _solve_task(task):
+    """Solve a subtree, returning (id, status, saves). The status is None if
+    the subtree was cancelled or is to be split, or the LengthError raised
+    by the search. The saves are those of the search (see
+    `SharedBackend.collect`).
+    """
+    i, position, ancestors = task
+    backend = _worker["backend"]
+    cancel, resplit = _worker["cancel"], _worker["resplit"]
+    try:
+        solver = Solver(position, backend=backend,
+            reverse=_worker["reverse"], deep=_worker["deep"],
+            known=_worker["known"])
+        while not resplit[i] and not any(cancel[a] for a in ancestors):
+            status = solver.run(max_nodes=_worker["slice_nodes"])
+            if status is not None:
+                return i, status, backend.collect()
+    except LengthError as e:
+        return i, e, backend.collect()
+    return i, None, backend.collect()
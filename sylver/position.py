@@ -1,11 +1,105 @@
 
 from .error import LengthError
+from .key import encode as encode_key
 
+from array import array
+from bisect import insort
 from bitarray import bitarray
-from copy import deepcopy
-from functools import reduce
+from functools import lru_cache, reduce
 import math
-import warnings
+import sys
+
+# Marks a value not yet computed (None is a valid `irreducible`). It must
+# keep its identity through pickling and copying, so it is not an object().
+_UNSET = False
+
+
+def closure(bits, n, length, mask=None):
+    """Close a set of integers under addition of `n`, i.e. return the set
+    S + {0, n, 2n, ...} truncated to `length`. Sets are encoded as integers
+    with bit i set when i is a member. Rather than stepping through the
+    members one by one, the shift is doubled on each pass, so that after k
+    passes the set contains S + {0, n, ..., (2**k - 1) n}. This costs
+    O(log(length / n)) word-parallel big integer operations.
+
+    Args:
+        bits (int): The set to close (must contain 0 to include `n` itself).
+        n (int): The number to close under.
+        length (int): Number of bits to keep.
+        mask (int, optional): (1 << length) - 1, if already at hand.
+
+    Returns:
+        bits (int): The closed set.
+    """
+    if mask is None:
+        mask = (1 << length) - 1
+    shift = n
+    while shift < length:
+        bits |= (bits << shift) & mask
+        shift <<= 1
+    return bits
+
+@lru_cache(maxsize=64)
+def multiples(n, length):
+    """Returns the set of multiples of `n` below `length` as an integer."""
+    if n == 1:
+        return (1 << length) - 1
+    return closure(1, n, length)
+
+try:
+    popcount = int.bit_count
+except AttributeError:
+    def popcount(bits):
+        """Returns the number of set bits."""
+        return bin(bits).count("1")
+
+def set_bits(bits, reverse=False):
+    """Returns an iterator over the indices of the set bits of an integer, in
+    ascending (or descending) order. The integer is unpacked into 64 bit
+    words once and only nonzero words are searched.
+    """
+    words = array("Q", bits.to_bytes(8 * ((bits.bit_length() + 63) // 64),
+        "little"))
+    if sys.byteorder == "big":
+        words.byteswap()
+    if not reverse:
+        for i, word in enumerate(words):
+            base = 64 * i
+            while word:
+                lowest = word & -word
+                yield base + lowest.bit_length() - 1
+                word ^= lowest
+    else:
+        for i in range(len(words) - 1, -1, -1):
+            word = words[i]
+            base = 64 * i
+            while word:
+                highest = word.bit_length() - 1
+                yield base + highest
+                word ^= 1 << highest
+
+def to_int(array):
+    """Convert a little-endian bitarray to an integer with bit i equal to
+    array[i]."""
+    return int.from_bytes(array.tobytes(), "little")
+
+def from_int(bits, length):
+    """Convert an integer to a little-endian bitarray of the given length."""
+    array = bitarray(endian="little")
+    array.frombytes(bits.to_bytes((length + 7) // 8, "little"))
+    del array[length:]
+    return array
+
+def _add_generator(generators, bits, n):
+    """Returns the minimal generators after adding the non-member `n`, given
+    the old `generators` and the new members `bits`. Every new member other
+    than n is n plus a member, so n is the only new generator. An old
+    generator g > n survives unless g = n + (g - n) with g - n now a member.
+    """
+    generators = [g for g in generators if g < n or not bits >> (g - n) & 1]
+    insort(generators, n)
+    return generators
+
 
 class Position(object):
     """Positions are the primary objects in the game of Sylver Coinage. They 
@@ -15,8 +109,17 @@ class Position(object):
     the gcd is greater than 1, all given values are with respect to the slice
     array[::gcd], which we call the reduced semigroup. This generalises the 
     concept of the semigroup.
+
+    Positions are compact and treated as immutable: the members are stored as
+    the bits of a single integer, and moves derive new positions with
+    `child()` rather than copying. Only `add(n, inplace=True)` modifies a
+    position. Invariants other than the generators and gcd are computed on
+    first access and memoized.
     """
 
+    __slots__ = ("generators", "gcd", "length", "_bits", "_key", "_gaps",
+        "_frobenius", "_genus", "_irreducible")
+
     def __init__(self, seeds, length=None):
         """
         Initialise the position.
@@ -35,38 +138,33 @@ class Position(object):
             raise ValueError("Seeds must have at least one element.")
         if any([s < 1 for s in seeds]):
             raise ValueError("Seeds cannot contain non-positive integers")
-        self._seeds = seeds 
 
         # Determine gcd
-        self._set_gcd()
+        self._set_gcd(seeds)
 
-        # Set length of the bitarray.
+        # Set length of the bit set.
         # If length not set take a length that is the minimum given generator
         # longer than the maximum possible Frobenius.
         if not length:
-            if len(self._seeds) > 1:
-                max_gcd1_frobenius = (self._seeds[-1] / self.gcd - 1) \
-                    * (self._seeds[-2] / self.gcd - 1) - 1
+            if len(seeds) > 1:
+                max_gcd1_frobenius = (seeds[-1] / self.gcd - 1) \
+                    * (seeds[-2] / self.gcd - 1) - 1
             else:
                 max_gcd1_frobenius = 0
             self.length = self.gcd * int(max_gcd1_frobenius) \
-                + min(self._seeds) + self.gcd
+                + min(seeds) + self.gcd
         else:
             self.length = length
 
-        # Initialise and fill the bitarray
+        # Initialise and fill the bit set
         self.generators = []
-        self.bitarray = bitarray(self.length)
-        self.bitarray.setall(0)
-        self.bitarray[0] = 1
-        for s in self._seeds:
+        self._bits = 1
+        for s in seeds:
             self._add(s)
+        self._reset()
 
-        # Set the frobenius number and throw error if insufficient length
-        self._set_frobenius()
-
-        # Set the irreducible type
-        self._set_irreducible()
+        # Throw error if insufficient length
+        self._check_length()
 
     def __repr__(self):
         return f"Position({self.generators})"
@@ -75,9 +173,25 @@ class Position(object):
         generators = str(self.generators)
         return "{{{}}}".format(generators[1:-1])
 
+    def __contains__(self, n):
+        return n >= 0 and bool(self._bits >> n & 1)
+
     @property
     def name(self):
         return str(self)
+
+    @property
+    def key(self):
+        """Returns the canonical compact key (see `sylver.key`), computed
+        once per position."""
+        if self._key is None:
+            self._key = encode_key(self.generators)
+        return self._key
+
+    @property
+    def bitarray(self):
+        """Returns the members as a (little-endian) bitarray of `length`."""
+        return from_int(self._bits, self.length)
     
     @property
     def embedding_dim(self):
@@ -87,23 +201,92 @@ class Position(object):
     @property
     def genus(self):
         """Returns cardinality of the set of gaps."""
-        return (~self.bitarray[::self.gcd]).count()
+        if self._genus is None:
+            self._genus = popcount(self.reduced_gaps)
+        return self._genus
+
+    @property
+    def frobenius(self):
+        """Returns the largest gap of the reduced semigroup (0 if none)."""
+        if self._frobenius is None:
+            self._frobenius = max(self.reduced_gaps.bit_length() - 1, 0)
+        return self._frobenius
+
+    @property
+    def irreducible(self):
+        """Returns the irreducible type of the semigroup: None, 's'
+        (symmetric), or 'p' (pseudosymmetric).
+
+        Every pair (i, F - i) contains at least one gap, as does F/2, so the
+        genus is at least (F + 1)/2 (odd F) or F/2 + 1 (even F), with equality
+        exactly when the reduced semigroup is antisymmetric around F/2.
+        """
+        if self._irreducible is _UNSET:
+            reduced_frob = int(self.frobenius / self.gcd)
+            genus = self.genus
+            if genus == 0:
+                self._irreducible = "p"
+            elif genus == reduced_frob // 2 + 1:
+                self._irreducible = "s" if (reduced_frob % 2) else "p"
+            else:
+                self._irreducible = None
+        return self._irreducible
 
     @property
     def multiplicity(self):
         """Returns least positive integer belonging to P."""
-        return min(self.generators)
+        return self.generators[0]
+
+    @property
+    def reduced_gaps(self):
+        """Returns the gaps of the reduced semigroup, i.e. the zeros of
+        array[::gcd], as an integer with the bits set at the gaps. Computed
+        at most once per position.
+        """
+        if self._gaps is None:
+            self._gaps = multiples(self.gcd, self.length) & ~self._bits
+        return self._gaps
     
-    def gaps(self, reverse=False):
-        """Returns an iterator over the gaps."""
-        if not reverse:
-            for i, b in enumerate(self.bitarray):
-                if not b: 
-                    yield i 
-        else:
-            for i, b in enumerate(self.bitarray[::-1]):
-                if not b: 
-                    yield self.length - 1 - i
+    def gaps(self, reverse=False, stop=None):
+        """Returns an iterator over the gaps (below `stop` if given). The gaps
+        are found by scanning the bit set a 64 bit word at a time.
+        """
+        stop = self.length if stop is None else min(stop, self.length)
+        return set_bits(((1 << stop) - 1) & ~self._bits, reverse=reverse)
+
+    def children(self, reverse=False, stop=None, skip_invalid=False):
+        """Returns an iterator over (gap, child) pairs for all gaps, i.e. every
+        legal move and its resulting position. The children are derived as by
+        `child()`, but what depends only on this position is done once for
+        all of them: the closure mask, and the length check, which a child
+        with the same gcd passes whenever its parent does (it has more
+        members and a multiplicity no larger). Only children with a smaller
+        gcd are checked.
+
+        Args:
+            reverse (bool): Iterate in descending order of gaps.
+            stop (int): Only consider gaps less than `stop`.
+            skip_invalid (bool): Skip children that raise a `LengthError`
+                instead of raising it.
+        """
+        generators, gcd, length, bits = self.generators, self.gcd, \
+            self.length, self._bits
+        mask = (1 << length) - 1
+        for gap in self.gaps(reverse=reverse, stop=stop):
+            child = Position.__new__(Position)
+            child._bits = closure(bits, gap, length, mask)
+            child.generators = _add_generator(generators, child._bits, gap)
+            child.gcd = gcd if gcd == 1 else math.gcd(gcd, gap)
+            child.length = length
+            child._reset()
+            if child.gcd != gcd:
+                try:
+                    child._check_length()
+                except LengthError:
+                    if skip_invalid:
+                        continue
+                    raise
+            yield gap, child
 
     def to_dict(self):
         """Returns dict of properties."""
@@ -118,8 +301,39 @@ class Position(object):
         }
 
     def copy(self):
-        """Return a (deep) copy of this object."""
-        return deepcopy(self)
+        """Return a copy of this object."""
+        pos = Position.__new__(Position)
+        pos.generators = self.generators
+        pos.gcd = self.gcd
+        pos.length = self.length
+        pos._bits = self._bits
+        pos._key = self._key
+        pos._gaps = self._gaps
+        pos._frobenius = self._frobenius
+        pos._genus = self._genus
+        pos._irreducible = self._irreducible
+        return pos
+
+    def child(self, n):
+        """Return the position resulting from adding `n`. This is the fast
+        path for making moves: the child is derived directly from this
+        position's bit set, without validating `n` or re-running `__init__`.
+        
+        Args:
+            n (int): The number to add (a positive integer).
+        
+        Returns:
+            pos (Position): Resulting Position object.
+        """
+        pos = Position.__new__(Position)
+        pos.generators = self.generators
+        pos.gcd = math.gcd(self.gcd, n)
+        pos.length = self.length
+        pos._bits = self._bits
+        pos._add(n)
+        pos._reset()
+        pos._check_length()
+        return pos
 
     def add(self, n, inplace=False):
         """Add a number to the position, i.e. make a move. This will return a
@@ -135,16 +349,13 @@ class Position(object):
         n = int(n)
         if n < 1:
             raise ValueError("Cannot add a non-positive integer")
-        if inplace:
-            pos = self
-        else:
-            pos = deepcopy(self)
-        pos._add(n)
-        pos._seeds = pos.generators
-        pos._set_gcd()
-        pos._set_frobenius()
-        pos._set_irreducible()
-        return pos
+        if not inplace:
+            return self.child(n)
+        self._add(n)
+        self._reset()
+        self.gcd = math.gcd(self.gcd, n)
+        self._check_length()
+        return self
 
     def apery_set(self, n):
         """Returns the Apery set of S with respect to n, i.e. the n-tuple 
@@ -153,74 +364,69 @@ class Position(object):
         """
         ntuple = [0] * n
         for i in range(n):
-            subarray = self.bitarray[::self.gcd][i::n]
-            ntuple[i] = (n * subarray.index(1) + i) * self.gcd
+            e = i
+            while not self._bits >> (e * self.gcd) & 1:
+                e += n
+                if e * self.gcd >= self.length:
+                    raise ValueError("1 is not in bitarray")
+            ntuple[i] = e * self.gcd
         return ntuple
     
     def reduce_length(self, mod=1):
-        """Remove extraneous 1s from end of bitarray. This can improve speed
-        for future computations.
+        """Remove extraneous 1s from end of bit set. This can improve speed
+        for future computations. Returns a new position.
         
         Args:
             mod (int): Mandates that length must be an integer multiple of mod. 
         """
-        self.length = self.frobenius + min(self.generators) + self.gcd
-        self.length = (self.length // mod + 1) * mod
-        self.bitarray = self.bitarray[:self.length]
-        return self
+        length = self.frobenius + min(self.generators) + self.gcd
+        length = (length // mod + 1) * mod
+        pos = self.copy()
+        pos.length = length
+        pos._bits = self._bits & ((1 << length) - 1)
+        if length > self.length:
+            # Everything beyond the frobenius is a member of the reduced set
+            pos._bits |= multiples(self.gcd, length) >> self.length \
+                << self.length
+        pos._gaps = None
+        return pos
 
-    def _set_gcd(self):
+    def _set_gcd(self, seeds):
         """Set the GCD and throw a warning if not 1.
         """
-        self.gcd = int(reduce(math.gcd, self._seeds))
+        self.gcd = int(reduce(math.gcd, seeds))
         if self.gcd != 1:
-            print("WARNING: gcd({})={} is not 1.".format(self._seeds, self.gcd))
+            print("WARNING: gcd({})={} is not 1.".format(seeds, self.gcd))
     
     def _add(self, n):
+        if n >= self.length:
+            raise IndexError("{} is out of range for length {}".format(n,
+                self.length))
         # Skip if already a member
-        if self.bitarray[n]:
+        if self._bits >> n & 1:
             return
         # Fill members n steps ahead of existing
-        for i, bit in enumerate(self.bitarray):
-            if not bit:
-                continue
-            self.bitarray[i::n] = 1
-        # Keep generators which are smaller than n, and those that eliminate
-        # members which n does not.
-        self.generators = sorted([g for g in self.generators if g < n or
-            (self.bitarray[:-g] & ~self.bitarray[g-n:-n]).any()] + [n])
+        self._bits = closure(self._bits, n, self.length)
+        self.generators = _add_generator(self.generators, self._bits, n)
     
-    def _set_frobenius(self):
-        # Check sufficient length
+    def _reset(self):
+        """Clear memoized invariants."""
+        self._key = None
+        self._gaps = None
+        self._frobenius = None
+        self._genus = None
+        self._irreducible = _UNSET
+
+    def _check_length(self):
+        """Throw error if the length is insufficient, i.e. the last min_gen
+        entries of the reduced array are not all members.
+        """
         min_gen = int(min(self.generators)/self.gcd)
-        if not self.bitarray[::self.gcd][-min_gen:].all():
+        reduced_length = (self.length + self.gcd - 1) // self.gcd
+        start = max(reduced_length - min_gen, 0) * self.gcd
+        if (self._bits >> start) != multiples(self.gcd, self.length) >> start:
             suggestion = (self.generators[-1] / self.gcd - 1) \
                 * (self.generators[-2] / self.gcd - 1) - 1
             raise LengthError("{}: Length insufficient! Must be at least "
                 "(frobenius + min(generators) + gcd) long! A length of {:.0f} "
                 "(but potentially smaller) will do.".format(self, suggestion))
-        # Frobenius is first 0 from the end
-        try:
-            reduced_array = self.bitarray[::self.gcd]
-            self.frobenius = ( len(reduced_array) \
-                - reduced_array[::-1].index(0) - 1 ) * self.gcd
-        except ValueError as e:
-            if str(e) == "0 is not in bitarray":
-                self.frobenius = 0
-            else:
-                raise e
-    
-    def _set_irreducible(self):
-        """Checks and sets `self.irreducible` which indicates whether the 
-        semigroup is irreducible. Irreducible is one of: None, 's' (symmetric),
-        or 'p' (pseudosymmetric).
-        """
-        reduced_frob = int(self.frobenius / self.gcd)
-        half_frob = (reduced_frob + 1) // 2
-        # Check for antisymmetry around half frobenius
-        left = self.bitarray[::self.gcd][:half_frob]
-        right = self.bitarray[::self.gcd][:reduced_frob + 1][::-1][:half_frob]
-        if left != ~right:
-            self.irreducible = None
-        else:
-            self.irreducible = "s" if (reduced_frob % 2) else "p"
\ No newline at end of file
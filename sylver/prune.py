@@ -0,0 +1,46 @@
+"""Pruning rules for `solve.solve`, after Sicherman's `scripts/sylver.py`.
+
+Pairing: if the move x loses to the reply y, i.e. the child after x is N
+with the winning reply y, then the move y loses to the reply x as well,
+since both lead to the same P position. So y need not be solved, provided
+x is still legal after y. This always holds when y > x (the members added
+by y are all greater than y) and is checked directly otherwise, i.e. when
+x and y form a clique.
+
+The script's fuse/bomb early exit stops its scan once m consecutive
+members (m the multiplicity) have been seen, as every larger number is then
+a member. `Position.gaps` never visits members and stops at the frobenius
+number, so it saves no child solves here.
+"""
+
+from .error import LengthError
+
+
+class Pairing():
+    """Pairing elimination. Counts the child solves saved by each rule in
+    `stats`.
+    """
+
+    def __init__(self):
+        self.stats = {"pair": 0, "clique": 0}
+
+    def skip(self, position, gap, child, backend, remaining):
+        """Called when the child after the move `gap` is N. Returns the
+        moves among `remaining` (the moves still to try) that can be
+        skipped.
+        """
+        skip = set()
+        for reply in backend.get_replies(child):
+            if reply not in remaining:
+                continue
+            if reply > gap:
+                self.stats["pair"] += 1
+            else:
+                try:
+                    if gap in position.child(reply):
+                        continue
+                except LengthError:
+                    continue
+                self.stats["clique"] += 1
+            skip.add(reply)
+        return skip
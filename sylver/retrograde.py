@@ -0,0 +1,187 @@
+"""Retrograde (bottom up) bulk solving of gcd = 1 positions by genus.
+
+The numerical semigroups form a tree rooted at {1} (all the naturals): the
+children of a semigroup S with frobenius F are S \\ {m} for the minimal
+generators m > F, which have genus one higher and frobenius m. Walking the
+tree level by level enumerates every semigroup of each genus exactly once.
+
+Every move from a position adds a gap, so leads to a position of lower
+genus. Solving the levels in order of genus, the status of each position
+follows from the statuses of the levels below it: it is N if some move leads
+to a P-position, and P otherwise ({1} is N as for `solve.quick`). Only the
+P-positions are kept in memory, as sets of gaps (N is the complement), and
+each level is streamed to a text file in `directory`, one position per line:
+
+    {name}<TAB>{status}<TAB>{replies, comma separated}
+
+A directory holds one table, whose `frobenius` bound and `deep` setting are
+recorded in `table.json`. Levels already written are read back instead of
+being solved again, so a table can be extended to a larger genus later, but
+not reused with other settings.
+"""
+
+from .position import Position, closure, set_bits
+from . import key as keys
+
+import json
+import os
+
+TABLE = "table.json"
+
+
+def solve(directory, genus=None, frobenius=None, backend=None, deep=False,
+        verbose=False):
+    """Solve every gcd = 1 position up to a genus (or frobenius) bound.
+
+    Args:
+        directory (str): Directory for the level files.
+        genus (int): Solve the positions of genus at most `genus`...
+        frobenius (int): ...and/or frobenius at most `frobenius`.
+        backend (BaseBackend): Save every position (status and replies) to
+            this backend as well.
+        deep (bool): Find all the replies of N-positions, rather than the
+            first.
+        verbose (bool): Print the counts of each level.
+
+    Returns:
+        [dict]: The genus, number of positions and number of P-positions of
+            each level.
+
+    Raises:
+        ValueError: If `directory` holds a table with another `frobenius`
+            bound or `deep` setting.
+    """
+    if genus is None and frobenius is None:
+        raise ValueError("A genus or frobenius bound is required")
+    # The gaps are at most the frobenius, so the genus is too
+    top = min(g for g in [genus, frobenius] if g is not None)
+    os.makedirs(directory, exist_ok=True)
+    _check_table(directory, {"frobenius": frobenius, "deep": deep})
+    p_gaps = set()
+    counts = []
+    for g in range(top + 1):
+        path = level_path(directory, g)
+        if not os.path.exists(path):
+            tmp = f"{path}.tmp"
+            with open(tmp, "w") as f:
+                for generators, status, replies in _level(directory, g,
+                        p_gaps, frobenius, deep):
+                    f.write(_line(generators, status, replies))
+            os.replace(tmp, path)
+        count = [0, 0]
+        for generators, status, replies in read_level(directory, g):
+            count[0] += 1
+            if status == "P":
+                count[1] += 1
+                p_gaps.add(_gaps(generators, g))
+            if backend is not None:
+                backend.save(Position(generators), status, replies)
+        counts.append({"genus": g, "positions": count[0], "P": count[1]})
+        if verbose:
+            print(f"genus {g}: {count[0]} positions, {count[1]} P")
+    return counts
+
+def fill(directory, backend, genus=None):
+    """Save the positions of the level files in `directory` (up to `genus`)
+    to a backend.
+
+    Returns:
+        int: The number of positions saved.
+    """
+    count = 0
+    g = 0
+    while os.path.exists(level_path(directory, g)) \
+            and (genus is None or g <= genus):
+        for generators, status, replies in read_level(directory, g):
+            backend.save(Position(generators), status, replies)
+            count += 1
+        g += 1
+    return count
+
+def _check_table(directory, settings):
+    """Record the settings of a new table, or check those of an existing
+    one.
+    """
+    path = os.path.join(directory, TABLE)
+    if os.path.exists(path):
+        with open(path) as f:
+            table = json.load(f)
+        if table != settings:
+            raise ValueError(f"{directory} holds a table with {table}, not "
+                f"{settings}")
+    elif os.path.exists(level_path(directory, 0)):
+        raise ValueError(f"{directory} holds a table without {TABLE}")
+    else:
+        with open(path, "w") as f:
+            json.dump(settings, f)
+
+def level_path(directory, genus):
+    return os.path.join(directory, f"genus-{genus:03d}.txt")
+
+def read_level(directory, genus):
+    """Yields (generators, status, replies) for each position of a level."""
+    with open(level_path(directory, genus)) as f:
+        for line in f:
+            name, status, replies = line.rstrip("\n").split("\t")
+            yield keys.decode(keys.from_name(name)), status, \
+                [int(r) for r in replies.split(",") if r]
+
+def _line(generators, status, replies):
+    return "{{{}}}\t{}\t{}\n".format(", ".join(map(str, generators)), status,
+        ",".join(map(str, replies)))
+
+def _gaps(generators, genus):
+    """Returns the gaps of a semigroup of `genus` as an integer with the bits
+    set at the gaps. The frobenius is less than 2 * genus.
+    """
+    length = 2 * genus + 1
+    members = 1
+    for g in generators:
+        members = closure(members, g, length)
+    return ((1 << length) - 1) & ~members
+
+def _level(directory, genus, p_gaps, frobenius, deep):
+    """Yields (generators, status, replies) for each position of `genus`,
+    the children of the positions of the level below it.
+    """
+    if genus == 0:
+        yield [1], "N", []
+        return
+    for parent, _, _ in read_level(directory, genus - 1):
+        gaps = _gaps(parent, genus - 1)
+        for m in parent:
+            # The frobenius of the parent is its largest gap
+            if m < gaps.bit_length() or (frobenius is not None
+                    and m > frobenius):
+                continue
+            child_gaps = gaps | 1 << m
+            status, replies = _status(child_gaps, m, p_gaps, deep)
+            yield _remove(parent, m, child_gaps), status, replies
+
+def _remove(generators, m, gaps):
+    """Returns the minimal generators of S \\ {m}, with `gaps` its gaps,
+    where m is a minimal generator of S. These are among the other
+    generators, m + g for the generators g, and 3m.
+    """
+    candidates = sorted(set(g for g in generators if g != m)
+        | set(m + g for g in generators) | {3 * m})
+    result = []
+    for c in candidates:
+        # Minimal unless c = g + s for a (smaller) generator g and member s
+        if all(gaps >> (c - g) & 1 for g in result):
+            result.append(c)
+    return result
+
+def _status(gaps, frobenius, p_gaps, deep):
+    """Returns the status and replies of the semigroup with `gaps`, given
+    the gaps of all P-positions of lower genus.
+    """
+    length = frobenius + 1
+    members = ((1 << length) - 1) & ~gaps
+    replies = []
+    for n in set_bits(gaps):
+        if (gaps & ~closure(members, n, length)) in p_gaps:
+            replies.append(n)
+            if not deep:
+                break
+    return ("N" if replies else "P"), replies
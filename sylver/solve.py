@@ -2,11 +2,14 @@
 
 from .backend import MemoryBackend
 from .error import LengthError
+from .known import KNOWN
+from .position import Position
 
 from sympy.ntheory.primetest import isprime
 
 
-def solve(position, backend=None, reverse=False, deep=False, verbose=False):
+def solve(position, backend=None, reverse=False, deep=False, verbose=False,
+        order=None, prune=None, known=KNOWN):
     """General purpose solver.
     
     # TODO: For GCD>1 positions, try odd moves, then short evens, then longs.
@@ -17,94 +20,227 @@ def solve(position, backend=None, reverse=False, deep=False, verbose=False):
         `reverse`: Loop over gaps in reverse.
         `deep`: Loop over all gaps (hence finding all replies).
         `verbose`: Print all statuses encountered.
+        `order`: A move ordering from `sylver.order` (e.g. `History()`),
+            shared by the whole search. By default gaps are tried in order.
+        `prune`: A pruning rule from `sylver.prune` (e.g. `Pairing()`),
+            which skips moves known to lose without solving them.
+        `known`: A table of known P-positions (`sylver.known`). Before
+            recursing, every child is checked against it and against the
+            backend (in one batch), and a node with a known winning reply
+            returns immediately. None disables the check.
     """
     # Ensure a backend to store results
     backend = backend or MemoryBackend()
-    replies = set([])
-    # If the position is [1] we are done 
-    if position.generators == [1]:
-        status = "N"
-    # Check quick status and backend if not deep mode
-    status = quick(position) or backend.get_status(position)
-    # Brute force the position according to kind
-    if status in ["P", "N"]:
-        pass
-    # gcd = 1
-    elif position.gcd == 1:
-        position = position.reduce_length()
-        for gap in position.gaps(reverse=reverse):
-            child = position.add(gap)
-            child_status = solve(child, backend=backend,
-                reverse=reverse, deep=deep, verbose=verbose)
-            if child_status == "P":
-                status = "N"
-                replies.add(gap)
-                if not deep:
-                    break
-    # gcd > 1 and short
-    elif position.irreducible == "s" and isprime(position.gcd):
-        for gap in position.gaps(reverse=reverse):
+    node = Node(position, backend, reverse=reverse, order=order, known=known,
+        deep=deep)
+    while not node.done:
+        move = node.next_child()
+        if move is None:
+            break
+        gap, child = move
+        child_status = solve(child, backend=backend, reverse=reverse,
+            deep=deep, verbose=verbose, order=order, prune=prune,
+            known=known)
+        node.update(gap, child_status, deep=deep, order=order, prune=prune,
+            child=child, backend=backend)
+    return node.finish(backend, verbose=verbose)
+
+class Node():
+    """Search state of a single position, shared by the recursive `solve` and
+    the explicit stack `engine.Solver`. The state is plain data (see
+    `to_dict`) so a search can be checkpointed and resumed.
+
+    On creation the status is looked up (`quick`, the `known` table, then the
+    backend) and, if it is not P or N, the position is classified and the gaps
+    to try are listed:
+    - gcd = 1: all gaps
+    - gcd > 1 and short: gaps up to the frobenius (Quiet End Theorem)
+    - gcd > 1 and long: all gaps, skipping children with insufficient length
+    With a `known` table the children are then prechecked (see `precheck`).
+
+    For instrumentation (see `sylver.instrument`), `source` records what
+    decided the status without a search ("quick:<rule>", "known", "backend"
+    or "precheck") and `length_errors` counts the children skipped for
+    insufficient length.
+    """
+
+    __slots__ = ("position", "kind", "status", "replies", "gaps", "index",
+        "gap", "skip", "children", "source", "length_errors")
+
+    def __init__(self, position, backend, reverse=False, order=None,
+            known=None, deep=False):
+        self.kind = None
+        self.replies = set()
+        self.gaps = []
+        self.index = 0
+        self.gap = None
+        self.skip = set()
+        self.children = {}
+        self.length_errors = 0
+        # Check quick status, known positions and backend
+        self.status, rule = quick_rule(position)
+        self.source = rule and f"quick:{rule}"
+        if not self.status and known is not None and position in known:
+            self.status, self.source = "P", "known"
+        if not self.status:
+            self.status = backend.get_status(position)
+            if self.status in ["P", "N"]:
+                self.source = "backend"
+        stop = None
+        # Brute force the position according to kind
+        if self.status in ["P", "N"]:
+            pass
+        # gcd = 1
+        elif position.gcd == 1:
+            position = position.reduce_length()
+            self.kind = "gcd1"
+        # gcd > 1 and short
+        elif position.irreducible == "s" and isprime(position.gcd):
             # No winning move greater than the frobenius (Quiet End Theorem)
-            if gap > position.frobenius:
-                continue
-            child = position.add(gap)
-            child_status = solve(child, backend=backend,
-                reverse=reverse, deep=deep, verbose=verbose)
-            if child_status == "P":
-                status = "N"
-                replies.add(gap)
-                if not deep:
-                    break
-            elif child_status == "?":
-                status = "?"
-    # gcd > 1 and long
-    else:
-        #TODO: gcd==2 periodicity theorem
-        print(f"{position.name} : LONG")
-        for gap in position.gaps(reverse=reverse):
+            self.kind = "short"
+            stop = position.frobenius + 1
+        # gcd > 1 and long
+        else:
+            #TODO: gcd==2 periodicity theorem
+            print(f"{position.name} : LONG")
+            self.kind = "long"
+        self.position = position
+        if self.kind:
+            self.gaps = list(position.gaps(reverse=reverse, stop=stop))
+            if order:
+                self.gaps = order.order(position, self.gaps, backend)
+            if known is not None:
+                self.precheck(backend, known, deep=deep)
+
+    @property
+    def done(self):
+        return self.index >= len(self.gaps)
+
+    def precheck(self, backend, known, deep=False):
+        """Sicherman's instant winner check: look up every child in the
+        `known` table and (in one batch) the backend. Children known to be P
+        are winning replies, so unless `deep` the node is done. Children
+        known to be N are skipped. Children with insufficient length are
+        left to `next_child`.
+        """
+        for gap in self.gaps:
             try:
-                child = position.add(gap)
+                self.children[gap] = self.position.child(gap)
             except LengthError:
-                continue
-            child_status = solve(child, backend=backend,
-                reverse=reverse, deep=deep, verbose=verbose)
-            if child_status == "P":
-                status = "N"
-                replies.add(gap)
+                pass
+        gaps = list(self.children)
+        statuses = backend.get_statuses(list(self.children.values()))
+        for gap, status in zip(gaps, statuses):
+            if status == "P" or self.children[gap] in known:
+                self.status = "N"
+                self.source = "precheck"
+                self.replies.add(gap)
                 if not deep:
+                    self.index = len(self.gaps)
                     break
-            elif child_status == "?":
-                status = "?"
-        else:
-            if not replies:
-                print("WARNING: Unable to find reply to long position: {}"
-                    .format(position))
-                status = status or "?"
-    # Save and return the results
-    status = status or "P"
-    backend.save(position, status, replies)
-    if verbose:
-        print(f"{status} : {position.name} ({list(replies) or []})")
-    return status
+                self.skip.add(gap)
+            elif status == "N":
+                self.skip.add(gap)
+
+    def next_child(self):
+        """Returns the next (gap, child) pair to solve, or None if there are
+        no more gaps to try.
+        """
+        while not self.done:
+            gap = self.gaps[self.index]
+            self.index += 1
+            if gap in self.skip:
+                continue
+            try:
+                child = self.children.pop(gap, None) \
+                    or self.position.child(gap)
+            except LengthError:
+                if self.kind == "long":
+                    self.length_errors += 1
+                    continue
+                raise
+            self.gap = gap
+            return gap, child
+        return None
+
+    def update(self, gap, child_status, deep=False, order=None, prune=None,
+            child=None, backend=None):
+        """Record the status of the child after the move `gap`. Pruning
+        needs the `child` position and the `backend`.
+        """
+        if order:
+            order.update(self.position, gap, child_status)
+        if prune and child_status == "N":
+            remaining = set(self.gaps[self.index:]) - self.skip
+            self.skip |= prune.skip(self.position, gap, child, backend,
+                remaining)
+        if child_status == "P":
+            self.status = "N"
+            self.replies.add(gap)
+            if not deep:
+                self.index = len(self.gaps)
+        elif child_status == "?" and self.kind in ["short", "long"]:
+            self.status = "?"
+
+    def finish(self, backend, verbose=False):
+        """Save and return the results."""
+        if self.kind == "long" and not self.replies:
+            print("WARNING: Unable to find reply to long position: {}"
+                .format(self.position))
+            self.status = self.status or "?"
+        status = self.status = self.status or "P"
+        backend.save(self.position, status, self.replies)
+        if verbose:
+            print(f"{status} : {self.position.name} "
+                f"({list(self.replies) or []})")
+        return status
+
+    def to_dict(self):
+        """Returns the search state as plain data."""
+        return {
+            "generators": self.position.generators,
+            "length": self.position.length,
+            "kind": self.kind,
+            "status": self.status,
+            "replies": sorted(self.replies),
+            "gaps": [g for g in self.gaps[self.index:]
+                if g not in self.skip],
+            "gap": self.gap,
+        }
+
+    @classmethod
+    def from_dict(cls, state):
+        """Restore the search state returned by `to_dict`."""
+        node = cls.__new__(cls)
+        node.position = Position(state["generators"], length=state["length"])
+        node.kind = state["kind"]
+        node.status = state["status"]
+        node.replies = set(state["replies"])
+        node.gaps = list(state["gaps"])
+        node.index = 0
+        node.gap = state["gap"]
+        node.skip = set()
+        node.children = {}
+        node.source = None
+        node.length_errors = 0
+        return node
 
 def quick(position):
     """Quick tests for whether the position status is known."""
+    return quick_rule(position)[0]
+
+def quick_rule(position):
+    """Returns the `quick` status and the name of the rule that decided it,
+    or (None, None).
+    """
     # All enders/quiet-enders are N except {2, 3}.
     # Note that [1] is irreducible (p) according to our definitions
     if position.gcd == 1 and position.irreducible \
             and position.generators != [2, 3]:
-        return "N"
+        return "N", "ender"
     # Single primes greater than 3 are P
     if len(position.generators) == 1 and position.generators[0] > 3 \
             and isprime(position.generators[0]):
-        return "P"
-    # Hard-coded (gcd > 1) P positions
-    # TODO: Solve these from first principles
-    # if position.generators == [8, 10, 22]:
-    #     return "P"
-    # if position.generators == [8, 10, 12, 14]:
-    #     return "P"
-    # if len(position.generators) == 4 and position.generators[:2] == [8, 12] \
-    #         and position.generators[2] % 8 == 2 \
-    #         and position.generators[3] == position.generators[2] + 4:
-    #     return "P"
+        return "P", "prime"
+    # Known (gcd > 1) P positions are in the `sylver.known` table
+    return None, None
@@ -1,35 +1,133 @@
 """Game tree (graph) representation."""
 
-import matplotlib.pyplot as plt
-import networkx as nx
-from networkx.drawing.nx_agraph import graphviz_layout
+from . import key as keys
 
+from array import array
+from collections import deque
 
-def tree(position):
+# Node status codes
+STATUSES = {1: "P", 2: "N"}
+# Translation of status codes to winning flags (1 for P)
+_WINNING = bytes([0, 1]) + bytes(254)
+
+
+class GameGraph():
+    """Compact game graph: nodes are integer ids (the root is 0) and the
+    edges are stored in compressed sparse row (CSR) arrays. The edges of node
+    i are `offsets[i]` to `offsets[i + 1]`, with the child ids in `targets`
+    and the moves (gaps) in `moves`. The genus of each node is in `genus`.
+    Positions are not kept, only their compact keys (see `sylver.key`), and
+    only if asked for.
+
+    After `solve`, `statuses` holds a status code per node (see `STATUSES`,
+    0 if unknown) and `winning` flags the edges of winning replies.
+    """
+
+    def __init__(self):
+        self.offsets = array("Q", [0])
+        self.targets = array("I")
+        self.moves = array("I")
+        self.genus = array("H")
+        self.keys = None
+        self.statuses = None
+        self.winning = None
+        self._index = None
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    @property
+    def n_edges(self):
+        return len(self.targets)
+
+    def children(self, node):
+        """Returns an iterator over the (move, child id) pairs of a node."""
+        start, end = self.offsets[node], self.offsets[node + 1]
+        return zip(self.moves[start:end], self.targets[start:end])
+
+    def name(self, node):
+        """Returns the position name of a node, or its id without keys."""
+        return keys.to_name(self.keys[node]) if self.keys else str(node)
+
+    def find(self, position):
+        """Returns the id of the node of a position (needs keys)."""
+        if self._index is None:
+            self._index = {key: i for i, key in enumerate(self.keys)}
+        return self._index[position.key]
+
+    def status(self, node):
+        """Returns the status ("P", "N" or None) of a node."""
+        return STATUSES.get(self.statuses[node]) if self.statuses else None
+
+    def replies(self, node):
+        """Returns the winning moves of a node (after `solve`)."""
+        start, end = self.offsets[node], self.offsets[node + 1]
+        return [self.moves[e] for e in range(start, end) if self.winning[e]]
+
+    def to_networkx(self):
+        """Returns the graph as a `networkx.DiGraph` (for small graphs), with
+        nodes keyed by name, a `status` per node, and per edge the move as
+        `name` and whether it is `winning`.
+        """
+        import networkx as nx
+        graph = nx.DiGraph()
+        for node in range(len(self)):
+            graph.add_node(self.name(node), status=self.status(node))
+        for node in range(len(self)):
+            start = self.offsets[node]
+            for e, (move, child) in enumerate(self.children(node), start):
+                graph.add_edge(self.name(node), self.name(child), name=move,
+                    winning=bool(self.winning and self.winning[e]))
+        return graph
+
+def tree(position, keep_keys=True):
     """Generates full game graph/tree from initial (gcd=1) position. This is an
-    acyclic directed graph.
+    acyclic directed graph. Nodes are expanded breadth first in order of id,
+    so the edges are appended in CSR order.
+
+    Args:
+        position (Position): The root position.
+        keep_keys (bool): Keep the keys of the positions in the graph (for
+            names and `find`). Keys are needed while building either way.
+
+    Returns:
+        GameGraph
     """
     if position.gcd > 1:
         raise ValueError("Position gcd must be equal to 1")
-    # Initialise the directed graph
-    graph = nx.DiGraph()
-    node = graph.add_node(position.name, position=position)
-    # Recursively add child nodes
-    def add_child_nodes(position):
-        for gap in position.gaps():
-            child = position.add(gap)
-            if not graph.has_node(child.name):
-                graph.add_node(child.name, position=child)
-                add_child_nodes(child)
-            graph.add_edge(position.name, child.name, name=gap)
-    add_child_nodes(position)
+    graph = GameGraph()
+    index = {position.key: 0}
+    node_keys = [position.key]
+    queue = deque([position])
+    while queue:
+        position = queue.popleft()
+        graph.genus.append(position.genus)
+        for gap, child in position.children():
+            key = child.key
+            i = index.get(key)
+            if i is None:
+                i = index[key] = len(node_keys)
+                node_keys.append(key)
+                queue.append(child)
+            graph.targets.append(i)
+            graph.moves.append(gap)
+        graph.offsets.append(len(graph.targets))
+    if keep_keys:
+        graph.keys = node_keys
+        graph._index = index
     return graph
 
 def plot(tree, include_1=False):
-    """Plot the game tree."""
+    """Plot the game tree (converted to networkx, so keep it small)."""
+    import matplotlib.pyplot as plt
+    import networkx as nx
+    from networkx.drawing.nx_agraph import graphviz_layout
+    graph = tree.to_networkx()
     if not include_1:
-        tree = tree.copy()
-        tree.remove_node("{1}")
+        # {1} is the node without children
+        graph.remove_nodes_from([tree.name(node) for node in range(len(tree))
+            if tree.offsets[node] == tree.offsets[node + 1]])
+    tree = graph
     pos = graphviz_layout(tree, prog="dot")
     plt.gcf().clear()
     colors = [{"P": "green", "N": "red", None: "gray"}.get(n.get("status"))
@@ -37,40 +135,27 @@ def plot(tree, include_1=False):
     edge_labels = {edge: data["name"] for edge, data in tree.edges.items()}
     nx.draw(tree, pos, arrows=True, with_labels=True, font_size=8,
         node_color=colors)
-    nx.draw_networkx_edge_labels(tree, pos, edge_labels=edge_labels, 
+    nx.draw_networkx_edge_labels(tree, pos, edge_labels=edge_labels,
         label_pos=0.8, font_size=6, alpha=0.7)
     return plt
 
 def solve(tree):
-    """Find P/N for all nodes on game tree."""
-    # Set {1} as N
-    tree.nodes["{1}"]["status"] = "N"
-    # Iteratively traverse, filling in P/N
-    def traverse():
-        complete = True
-        for name, data in tree.nodes.items():
-            status = data.get("status")
-            # Skip if already known
-            if status:
-                continue
-            complete = False
-            # If has one child P, then it's N
-            # If has all children N, then it's P
-            for child in tree.successors(name):
-                child_status = tree.nodes[child].get("status")
-                if not child_status:
-                    break
-                if child_status == "P":
-                    print("{}: N".format(name))
-                    data["status"] = "N"
-                    break
-            else:
-                print("{}: P".format(name))
-                data["status"] = "P"
-        return complete
-    # Loop until we are complete
-    iteration = 0
-    while not traverse():
-        iteration = iteration + 1
-        print("Traverse iteration: {}".format(iteration))
-    print("Done!")
+    """Find P/N for all nodes on game tree, in a single retrograde pass.
+
+    Every move lowers the genus, so visiting the nodes in order of genus
+    visits the children of a node before it (a reverse topological order).
+    {1}, the only node without children, is N; any other node is N if a
+    child is P and P otherwise. Each node and edge is visited once, the
+    edges of a node in one slice. The edges of winning replies (to P
+    children) are flagged in `winning`.
+    """
+    offsets, targets = tree.offsets, tree.targets
+    statuses = bytearray(len(tree))
+    get = statuses.__getitem__
+    for node in sorted(range(len(tree)), key=tree.genus.__getitem__):
+        start, end = offsets[node], offsets[node + 1]
+        statuses[node] = 2 if start == end \
+            or 1 in bytes(map(get, targets[start:end])) else 1
+    tree.statuses = statuses
+    # 1 where the child is P
+    tree.winning = bytearray(bytes(map(get, targets)).translate(_WINNING))
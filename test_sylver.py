@@ -1,12 +1,636 @@
 """Tests for package."""
 
-from sylver.position import Position
+from sylver import key as keys
+from sylver.backend import BoundedMemoryBackend, CachedBackend, MemoryBackend
+from sylver.backend.hashfile import HashFileBackend
+from sylver.backend.sqlite import SQLiteBackend
+from sylver.order import ORDERINGS, InstantWinner
+from sylver.parallel import ParallelSolver, SharedTable, \
+    solve as parallel_solve
+from sylver.apery import AperyPosition
+from sylver.engine import Solver
+from sylver import anytime
+from sylver import retrograde
+from sylver import instrument
+from sylver.known import KNOWN, KnownPositions
+from sylver.error import LengthError
+from sylver.position import Position, closure
+from sylver.prune import Pairing
 from sylver.solve import solve
 
+import copy
+import pickle
 import pytest
+import threading
 
 verbose = True
 
+def test_closure():
+    """Shift doubling closure matches the member by member fill."""
+    for seeds, n, length in [([0], 5, 40), ([0, 7], 3, 50), ([0, 4, 6], 9, 100),
+            ([0, 11, 13], 40, 30)]:
+        expected = set(seeds)
+        for i in range(length):
+            if i in expected:
+                expected.update(range(i, length, n))
+        bits = closure(sum(1 << s for s in seeds), n, length)
+        assert bits == sum(1 << i for i in expected)
+
+def test_child():
+    """Children derived from the parent match freshly constructed positions."""
+    position = Position([9, 11])
+    for gap in position.gaps():
+        child = position.child(gap)
+        fresh = Position([9, 11, gap], length=position.length)
+        assert child.to_dict() == fresh.to_dict()
+        assert child.bitarray == fresh.bitarray
+    assert position.to_dict() == Position([9, 11]).to_dict()
+
+def test_gaps_and_children():
+    for position in [Position([16, 21]), Position([4, 6], length=200),
+            Position([61, 67])]:
+        array = position.bitarray
+        gaps = [i for i in range(position.length) if not array[i]]
+        assert list(position.gaps()) == gaps
+        assert list(position.gaps(reverse=True)) == gaps[::-1]
+        assert list(position.gaps(stop=50)) == [g for g in gaps if g < 50]
+        children = list(position.children(reverse=True, skip_invalid=True))
+        valid = []
+        for gap in gaps[::-1]:
+            try:
+                position.add(gap)
+                valid.append(gap)
+            except LengthError:
+                pass
+        assert [gap for gap, _ in children] == valid
+        for gap, child in children:
+            fresh = position.add(gap)
+            assert child.to_dict() == fresh.to_dict()
+            assert child.bitarray == fresh.bitarray
+
+def test_position_copies():
+    """Pickled and copied positions keep their invariants and status."""
+    for position in [Position([9, 11]).child(13), Position([8, 9, 13]),
+            Position([6, 9])]:
+        for other in [pickle.loads(pickle.dumps(position)),
+                copy.deepcopy(position), copy.copy(position)]:
+            assert other.irreducible == position.irreducible
+            assert other.key == position.key
+            assert solve(other) == solve(position)
+
+def test_position_batch():
+    """Batched invariants and quick() agree with per position results."""
+    np = pytest.importorskip("numpy")
+    from sylver.batch import PositionBatch
+    from sylver.solve import quick
+    for seeds, length in [([16, 21], None), ([7], 30), ([2], 30),
+            ([8, 12, 18, 22], 130), ([10], 60), ([22, 33], None)]:
+        position = Position(seeds, length=length)
+        gaps, batch = PositionBatch.children(position)
+        valid = batch.valid()
+        for i, gap in enumerate(gaps):
+            try:
+                child = position.add(int(gap))
+            except LengthError:
+                assert not valid[i]
+                continue
+            assert valid[i]
+            assert batch.frobenius()[i] == child.frobenius
+            assert batch.genus()[i] == child.genus
+            assert (batch.irreducible()[i] or None) == child.irreducible
+            assert (batch.quick()[i] or None) == quick(child)
+            assert batch.single[i] == (child.generators[0]
+                if len(child.generators) == 1 else 0)
+    assert list(PositionBatch([Position([5]), Position([2, 3]),
+        Position([6, 9, 20])]).quick()) == ["P", "", "N"]
+
+def test_apery_position():
+    """Apery set backed positions agree with bit set positions."""
+    for seeds, moves in [([9, 11], [13, 5]), ([16, 21], [30, 23]),
+            ([6, 10], [15, 4]), ([8, 12], [18, 22, 41]), ([7], [3])]:
+        position = Position(seeds, length=1000)
+        apery = AperyPosition(seeds)
+        assert apery.apery == AperyPosition.from_position(position).apery
+        for n in moves:
+            position = position.add(n)
+            apery = apery.add(n)
+            assert apery.to_dict() == position.to_dict()
+        if position.gcd == 1:
+            assert list(apery.gaps()) == list(position.gaps())
+
+def minimal_generators(members, bound):
+    """Brute force minimal generators of a set of members below bound."""
+    return [x for x in range(1, bound) if x in members
+        and not any(y in members and x - y in members for y in range(1, x))]
+
+def semigroups(max_genus):
+    """All numerical semigroups up to a genus, by removing generators larger
+    than the Frobenius number (each semigroup is reached exactly once).
+    """
+    bound = 3 * max_genus + 2
+    level = [(frozenset(range(bound)), 0)]
+    while level:
+        yield from (members for members, _ in level)
+        children = []
+        for members, frobenius in level:
+            if bound - len(members) >= max_genus:
+                continue
+            for g in minimal_generators(members, bound):
+                if g > frobenius:
+                    children.append((members - {g}, g))
+        level = children
+
+def test_generators_up_to_genus():
+    """Incrementally maintained generators match a brute force computation
+    for every move from every numerical semigroup up to genus 9.
+    """
+    for members in semigroups(9):
+        bound = 3 * 9 + 2
+        generators = minimal_generators(members, bound)
+        position = Position(generators, length=4 * bound)
+        assert position.generators == generators
+        for gap in position.gaps():
+            child = position.child(gap)
+            closed = set(members)
+            for i in range(bound):
+                if i in closed:
+                    closed.update(range(i, bound, gap))
+            assert child.generators == minimal_generators(closed, bound)
+
+def test_key():
+    position = Position([9, 11]).add(13)
+    assert keys.decode(position.key) == position.generators
+    assert keys.from_name(position.name) == position.key
+    assert keys.to_name(position.key) == position.name
+    assert AperyPosition([9, 11, 13]).key == position.key
+    assert Position([12, 8, 20]).key == Position([8, 12]).key
+
+def test_bounded_memory_backend():
+    backend = BoundedMemoryBackend(max_size=5, evict_fraction=0.5)
+    assert solve(Position([10]), backend=backend, known=None) == "N"
+    stats = backend.stats
+    assert stats["size"] <= 5 and stats["evictions"] > 0
+    assert stats["hits"] + stats["misses"] > 0
+    backend.save(Position([5]), "P", [])
+    for n in range(12, 22):
+        backend.save(Position([11, n]), "N", [n + 1])
+    assert backend.get_status(Position([5])) == "P"
+    backend.save(Position([9, 11]), "N", [13])
+    backend.save(Position([9, 11]), "N", [5])
+    assert list(backend.positions[Position([9, 11]).key][1:]) == [5, 13]
+    # Re-saving makes a record the most recent, so others of equal priority
+    # (all of genus 6 here) are evicted first
+    backend = BoundedMemoryBackend(max_size=3, evict_fraction=0)
+    a, b, c = Position([2, 13]), Position([3, 7]), Position([4, 5])
+    for position in [a, b, c, a]:
+        backend.save(position, "N", [])
+    backend.save(Position([11, 12]), "N", [])
+    assert backend.get_status(a) == "N" and backend.get_status(b) is None
+
+@pytest.fixture(params=["memory", "bounded", "hashfile", "sqlite", "redis",
+    "postgres", "cached"])
+def backend(request, tmp_path, monkeypatch):
+    """Each backend, with the services stood in for by fakeredis and
+    `StubPostgres`.
+    """
+    name = request.param
+    if name == "memory":
+        backend = MemoryBackend()
+    elif name == "bounded":
+        backend = BoundedMemoryBackend()
+    elif name == "hashfile":
+        backend = HashFileBackend(str(tmp_path / "sylver.hash"), slots=16)
+    elif name == "sqlite":
+        backend = SQLiteBackend(str(tmp_path / "sylver.db"), batch_size=100)
+    elif name == "redis":
+        fakeredis = pytest.importorskip("fakeredis")
+        from sylver.backend.redis import RedisBackend
+        backend = RedisBackend(client=fakeredis.FakeRedis())
+    elif name == "postgres":
+        pytest.importorskip("psycopg2")
+        from sylver.backend import postgres
+        stub = StubPostgres()
+        monkeypatch.setattr(postgres.psycopg2, "connect", lambda dsn: stub)
+        monkeypatch.setattr(postgres, "execute_values", stub.execute_values)
+        backend = postgres.PostgresBackend("stub")
+    elif name == "cached":
+        backend = CachedBackend(MemoryBackend(), size=10,
+            shared=HashFileBackend(str(tmp_path / "shared.hash")))
+    yield backend
+    if hasattr(backend, "close"):
+        backend.close()
+
+def test_backend(backend):
+    """Every backend agrees with MemoryBackend on solves and merges replies.
+    The stored backends keep a P/N status over "?"."""
+    memory = MemoryBackend()
+    for seeds in [[8, 9, 13], [10, 11, 13]]:
+        assert solve(Position(seeds), backend=backend, known=None) \
+            == solve(Position(seeds), backend=memory, known=None)
+    positions = [Position(keys.decode(key)) for key in memory.positions]
+    assert backend.get_statuses(positions) \
+        == [entry["status"] for entry in memory.positions.values()]
+    for position in positions:
+        assert backend.get_status(position) == memory.get_status(position)
+        assert backend.get_replies(position) \
+            == memory.get_replies(position)
+    backend.save(Position([9, 11]), "N", [13])
+    backend.save(Position([9, 11]), "N", [5])
+    assert backend.get_status(Position([9, 11])) == "N"
+    assert backend.get_replies(Position([9, 11])) == {5, 13}
+    assert backend.get_status(Position([9, 13])) is None
+    assert backend.get_replies(Position([9, 13])) == set()
+    if not isinstance(backend, (MemoryBackend, BoundedMemoryBackend)):
+        backend.save(Position([9, 11]), "?", [7])
+        assert backend.get_status(Position([9, 11])) == "N"
+        assert backend.get_replies(Position([9, 11])) == {5, 7, 13}
+
+def test_hash_file_backend(tmp_path):
+    """The file grows, persists, and is shared between handles."""
+    path = str(tmp_path / "sylver.hash")
+    backend = HashFileBackend(path, slots=16)
+    other = HashFileBackend(path)
+    positions = [Position([11, n]) for n in range(12, 40) if n % 11]
+    for position in positions:
+        backend.save(position, "P", [])
+    assert backend.stats["slots"] > 16
+    # The other handle follows the file through its growth
+    assert all(other.get_status(p) == "P" for p in positions)
+    other.save(Position([9, 11]), "N", [13])
+    assert backend.get_replies(Position([9, 11])) == {13}
+    backend.close()
+    other.close()
+    backend = HashFileBackend(path)
+    assert backend.stats["size"] == len(positions) + 1
+    assert backend.get_status(Position([9, 11])) == "N"
+
+def test_sqlite_backend(tmp_path):
+    """Saves are committed in batches to a WAL database, and on close."""
+    path = str(tmp_path / "sylver.db")
+    backend = SQLiteBackend(path, batch_size=3, batch_ms=10**6)
+    assert backend.conn.execute("PRAGMA journal_mode").fetchone()[0] == "wal"
+    backend.save(Position([9, 11]), "N", [13])
+    backend.save(Position([9, 13]), "P", [])
+    assert backend.pending == 2
+    backend.save(Position([9, 14]), "P", [])
+    assert backend.pending == 0
+    backend.save(Position([9, 11]), "?", [5])
+    backend.close()
+    backend = SQLiteBackend(path)
+    assert backend.get_status(Position([9, 11])) == "N"
+    assert backend.get_replies(Position([9, 11])) == {5, 13}
+
+def test_redis_backend():
+    """migrate converts YAML entries to the status and reply set layout."""
+    fakeredis = pytest.importorskip("fakeredis")
+    yaml = pytest.importorskip("yaml")
+    from sylver.backend.redis import RedisBackend
+    backend = RedisBackend(client=fakeredis.FakeRedis())
+    backend.save(Position([9, 11]), "N", [13])
+    # One of them under a binary key ending with b":r"
+    tail = keys.encode([9, 14962])
+    assert tail.endswith(b":r")
+    backend.redis.set(tail, yaml.safe_dump({"status": "P"}))
+    backend.redis.set("{5, 7}", yaml.safe_dump({"status": "N",
+        "replies": [9]}))
+    backend.redis.set(Position([9, 11]).name, yaml.safe_dump({"status": "?",
+        "replies": [5]}))
+    backend.migrate()
+    assert backend.redis.get(tail) == b"P"
+    assert backend.get_status(Position([5, 7])) == "N"
+    assert backend.get_replies(Position([5, 7])) == {9}
+    assert backend.get_status(Position([9, 11])) == "N"
+    assert backend.get_replies(Position([9, 11])) == {5, 13}
+
+class StubPostgres():
+    """Stands in for a psycopg2 connection and its cursors, keeping the
+    status and reply tables in dicts and counting the writes.
+    """
+
+    def __init__(self):
+        self.statuses = {}
+        self.replies = set()
+        self.writes = 0
+        self.rows = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        pass
+
+    def cursor(self):
+        return self
+
+    def close(self):
+        pass
+
+    def execute(self, query, params=None):
+        if "FROM status" in query:
+            keys = [bytes(k.adapted) for k in params["keys"]]
+            self.rows = [(k, self.statuses[k]) for k in keys
+                if k in self.statuses]
+        elif "FROM reply" in query:
+            self.rows = [(r,) for k, r in self.replies if k == params["key"]]
+
+    def fetchall(self):
+        return self.rows
+
+    def execute_values(self, cursor, query, rows, page_size=None):
+        self.writes += 1
+        if "INTO status" in query:
+            for key, status in rows:
+                if self.statuses.get(key) not in ["P", "N"]:
+                    self.statuses[key] = status
+        elif "INTO reply" in query:
+            self.replies.update(rows)
+
+def test_postgres_backend(monkeypatch):
+    """Buffered saves merge, are read through and are flushed on batch_size,
+    batch_ms and close."""
+    pytest.importorskip("psycopg2")
+    from sylver.backend import postgres
+    stub = StubPostgres()
+    monkeypatch.setattr(postgres.psycopg2, "connect", lambda dsn: stub)
+    monkeypatch.setattr(postgres, "execute_values", stub.execute_values)
+    a, b, c = Position([9, 11]), Position([8, 9, 13]), Position([10, 11, 13])
+    # Write-through by default
+    backend = postgres.PostgresBackend("stub")
+    backend.save(a, "N", [3])
+    assert stub.statuses == {a.key: "N"} and not backend.buffer
+    # Buffered saves merge and are read through
+    backend = postgres.PostgresBackend("stub", batch_size=4, batch_ms=10**6)
+    backend.save(a, "?", [])
+    backend.save(b, "?", [])
+    backend.save(b, "P", [])
+    backend.save(b, "?", [])
+    backend.save(c, "N", [2])
+    backend.save(c, "N", [5])
+    assert stub.statuses == {a.key: "N"}
+    assert backend.get_statuses([a, b, c, Position([5, 7])]) \
+        == ["N", "P", "N", None]
+    assert backend.get_replies(c) == {2, 5}
+    assert backend.get_replies(a) == {3}
+    # batch_size
+    writes = stub.writes
+    backend.save(Position([6, 7]), "P", [])
+    assert not backend.buffer and stub.writes > writes
+    assert stub.statuses[b.key] == "P" and stub.statuses[a.key] == "N"
+    assert {(c.key, 2), (c.key, 5)} <= stub.replies
+    # batch_ms
+    backend = postgres.PostgresBackend("stub", batch_size=100, batch_ms=0)
+    backend.save(Position([5, 8]), "N", [])
+    assert not backend.buffer
+    # close
+    backend = postgres.PostgresBackend("stub", batch_size=100,
+        batch_ms=10**6)
+    backend.save(Position([5, 9]), "N", [])
+    assert backend.buffer
+    backend.close()
+    assert not backend.buffer and stub.statuses[Position([5, 9]).key] == "N"
+
+def test_cached_backend(tmp_path):
+    memory = MemoryBackend()
+    shared = HashFileBackend(str(tmp_path / "sylver.hash"))
+    backend = CachedBackend(memory, size=10, shared=shared)
+    assert solve(Position([8, 9, 13]), backend=backend, known=None) == "N"
+    assert backend.stats["size"] == 10
+    assert shared.stats["size"] == len(memory.positions)
+    backend.save(Position([9, 11]), "?", [])
+    assert Position([9, 11]).key not in backend.cache
+    # Final statuses are served from the cache tiers
+    backend = CachedBackend(MemoryBackend(), size=10, shared=shared)
+    assert backend.get_status(Position([8, 9, 13])) == "N"
+    assert backend.get_status(Position([8, 9, 13])) == "N"
+    assert backend.get_status(Position([9, 11])) is None
+    stats = backend.stats
+    assert (stats["hits"], stats["shared_hits"], stats["misses"]) \
+        == (1, 1, 1)
+    # Threads share a small LRU, evicting each other's entries
+    backend = CachedBackend(MemoryBackend(), size=8)
+    positions = [Position([11, n]) for n in range(12, 22)]
+    def worker():
+        for _ in range(200):
+            for position in positions:
+                backend.save(position, "N", [])
+                assert backend.get_status(position) == "N"
+    threads = [threading.Thread(target=worker) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert backend.stats["size"] == 8
+    assert sum(backend.stats[k] for k in ["hits", "shared_hits", "misses"]) \
+        == 8 * 200 * len(positions)
+
+def test_orderings():
+    """Every move ordering finds the same status and a genuine reply."""
+    for name, ordering in ORDERINGS.items():
+        for seeds, expected in [([10, 11, 13], "N"), ([6, 9], "P"),
+                ([8, 9, 13], "N")]:
+            backend = MemoryBackend()
+            position = Position(seeds)
+            assert solve(position, backend=backend, order=ordering()) \
+                == expected
+            for reply in backend.get_replies(position):
+                assert solve(position.add(reply)) == "P"
+    # Instant winners come from the known table and one batched lookup
+    class Lookups(MemoryBackend):
+        def __init__(self):
+            super().__init__()
+            self.lookups = []
+        def get_status(self, position):
+            self.lookups.append("get_status")
+            return super().get_status(position)
+        def get_statuses(self, positions):
+            self.lookups.append("get_statuses")
+            return [MemoryBackend.get_status(self, p) for p in positions]
+    backend = Lookups()
+    gaps = list(Position([4]).gaps())
+    assert InstantWinner().order(Position([4]), gaps, backend)[0] == 6
+    assert InstantWinner(known=None).order(Position([4]), gaps, backend) \
+        == gaps
+    position = Position([9, 11])
+    backend.save(position.child(13), "P", [])
+    backend.lookups = []
+    assert InstantWinner().order(position, list(position.gaps()),
+        backend)[0] == 13
+    assert backend.lookups == ["get_statuses"]
+
+def test_engine(tmp_path):
+    """The explicit stack solver agrees with solve, and resumes from a
+    checkpoint."""
+    for seeds in [[6], [10], [6, 9], [8, 9, 13], [8, 12, 18, 22, 41]]:
+        assert Solver(Position(seeds)).run() == solve(Position(seeds))
+    solver = Solver(Position([11, 14, 17]))
+    assert solver.run(max_nodes=100) is None
+    path = tmp_path / "checkpoint.json"
+    solver.checkpoint(path)
+    solver = Solver.resume(path)
+    assert solver.run() == solve(Position([11, 14, 17])) == "N"
+    assert solver.nodes > 100
+
+def test_anytime():
+    """Budgeted solves report partial results and make progress across calls,
+    and agree with solve when they finish."""
+    position = Position([11, 14, 17])
+    backend = MemoryBackend()
+    result = anytime.solve(position, backend=backend, nodes=300, known=None)
+    assert result["status"] is None and result["unknown"]
+    for _ in range(20):
+        moves = len(result["unknown"])
+        result = anytime.solve(position, backend=backend, nodes=300,
+            known=None)
+        assert len(result["unknown"]) <= moves
+        if result["status"]:
+            break
+    assert result["status"] == solve(position) == "N" and result["replies"]
+    result = anytime.solve(Position([10, 11, 13]), deep=True)
+    backend = MemoryBackend()
+    solve(Position([10, 11, 13]), backend=backend, deep=True)
+    assert set(result["replies"]) == backend.get_replies(Position([10, 11, 13]))
+    assert not result["unknown"]
+
+def test_anytime_pairing():
+    """Pairing prunes the root's pending moves and keeps the result."""
+    position = Position([10, 11, 13])
+
+    class RootPairing(Pairing):
+        def skip(self, node, gap, child, backend, remaining):
+            skip = super().skip(node, gap, child, backend, remaining)
+            if node == position:
+                self.pruned |= skip
+            return skip
+
+    prune = RootPairing()
+    prune.pruned = set()
+    result = anytime.solve(position, deep=True, prune=prune, known=None)
+    assert prune.pruned and prune.pruned <= set(result["losing"])
+    assert result == {**anytime.solve(position, deep=True, known=None),
+        "nodes": result["nodes"]}
+
+def test_retrograde(tmp_path):
+    """The bulk solve enumerates each genus once and agrees with solve."""
+    backend = MemoryBackend()
+    counts = retrograde.solve(tmp_path, genus=7, backend=backend)
+    assert [c["positions"] for c in counts] == [1, 1, 2, 4, 7, 12, 23, 39]
+    for g in range(8):
+        for generators, status, replies in retrograde.read_level(tmp_path, g):
+            position = Position(generators)
+            assert position.generators == generators
+            assert backend.get_status(position) == status \
+                == solve(position, known=None)
+            for reply in replies:
+                assert solve(position.child(reply), known=None) == "P"
+    counts = retrograde.solve(tmp_path, genus=9)
+    assert counts[-1]["positions"] == 118
+    assert retrograde.fill(tmp_path, MemoryBackend()) == sum(
+        c["positions"] for c in counts)
+    # Tables are not reused with other settings
+    bounded = tmp_path / "bounded"
+    counts = retrograde.solve(bounded, genus=6, frobenius=5)
+    assert [c["positions"] for c in counts] == [1, 1, 2, 4, 3, 1]
+    with pytest.raises(ValueError):
+        retrograde.solve(bounded, genus=6)
+    with pytest.raises(ValueError):
+        retrograde.solve(tmp_path, genus=9, deep=True)
+
+def test_tree():
+    """Retrograde labelling of the game graph agrees with solve."""
+    from sylver import tree
+    graph = tree.tree(Position([6, 7]))
+    tree.solve(graph)
+    assert len(graph) == 53 and graph.n_edges == 390
+    for node in range(len(graph)):
+        position = Position(keys.decode(graph.keys[node]))
+        assert graph.status(node) == solve(position, known=None)
+        for move, child in graph.children(node):
+            assert (move in graph.replies(node)) == (graph.status(child) == "P")
+    assert graph.find(Position([6, 7])) == 0
+    nx = pytest.importorskip("networkx")
+    digraph = graph.to_networkx()
+    assert isinstance(digraph, nx.DiGraph)
+    assert digraph.nodes["{6, 7}"]["status"] == graph.status(0)
+
+def test_pairing():
+    """Pruning keeps the status, and the replies of deep solves."""
+    for seeds in [[8, 9, 13], [10, 11, 13]]:
+        for reverse in [False, True]:
+            position = Position(seeds)
+            backend, pruned_backend = MemoryBackend(), MemoryBackend()
+            prune = Pairing()
+            assert solve(position, backend=backend, deep=True,
+                reverse=reverse) == solve(position, backend=pruned_backend,
+                deep=True, reverse=reverse, prune=prune)
+            assert backend.get_replies(position) \
+                == pruned_backend.get_replies(position)
+            assert prune.stats["pair"] + prune.stats["clique"] > 0
+
+def test_known_positions(tmp_path):
+    """Known P-positions decide their parents without a search."""
+    assert Position([8, 10, 22]) in KNOWN and Position([5]) in KNOWN
+    assert Position([8]) not in KNOWN
+    for seeds in [[8], [12, 15], [8, 10]]:
+        backend = MemoryBackend()
+        assert solve(Position(seeds), backend=backend) == "N"
+        assert len(backend.positions) == 1
+    # Results agree with the unchecked search
+    for seeds in [[6], [9], [6, 9], [8, 9, 13], [10, 11, 13]]:
+        assert solve(Position(seeds)) == solve(Position(seeds), known=None)
+    known = KnownPositions([[7], Position([12, 15, 18])])
+    path = tmp_path / "known.txt"
+    known.save(path)
+    known = KnownPositions().load(path)
+    assert Position([12, 15, 18]) in known and len(known) == 2
+
+def test_parallel():
+    """The parallel solver agrees with solve and shares statuses."""
+    table = SharedTable(size=16)
+    table.put(Position([5]).key, "P")
+    table.put(Position([6, 9]).key, "P")
+    table.put(Position([6]).key, "N")
+    assert table.get(Position([5]).key) == "P"
+    assert table.get(Position([6]).key) == "N"
+    assert table.get(Position([7]).key) is None
+    for seeds in [[6], [6, 9], [8, 9, 13], [11, 14, 17]]:
+        backend = MemoryBackend()
+        position = Position(seeds)
+        assert parallel_solve(position, processes=2, backend=backend) \
+            == solve(position)
+        for reply in backend.get_replies(position):
+            assert solve(position.add(reply)) == "P"
+    # The workers' saves reach the backend, and with a single task the
+    # idle process gets work by splitting it
+    memory, backend = MemoryBackend(), MemoryBackend()
+    position = Position([10, 14, 26, 31])
+    solver = ParallelSolver(position, processes=2, backend=backend,
+        max_split=0, slice_nodes=50, deep=True)
+    assert solver.run() == solve(position, backend=memory, deep=True)
+    assert solver.resplits > 0
+    assert memory.positions.keys() <= backend.positions.keys()
+    for key, entry in memory.positions.items():
+        assert backend.positions[key]["status"] == entry["status"]
+    assert backend.get_replies(position) == memory.get_replies(position)
+
+def test_instrument():
+    """Statistics are consistent with the solve."""
+    snapshots = []
+    backend = MemoryBackend()
+    status, stats = instrument.solve(Position([10, 11, 13]), backend=backend,
+        progress=snapshots.append, every=10, timers=True)
+    assert status == solve(Position([10, 11, 13])) == "N"
+    result = stats.to_dict()
+    assert result["nodes"] == len(backend.positions)
+    assert sum(d["nodes"] for d in result["depths"].values()) \
+        == result["nodes"]
+    assert sum(k["nodes"] for k in result["kinds"].values()) \
+        == result["nodes"]
+    assert result["largest"][0] == {"position": "{10, 11, 13}",
+        "nodes": result["nodes"], "status": "N"}
+    assert result["timers"]["Position.child"]["calls"] > 0
+    assert len(snapshots) == result["nodes"] // 10
+    assert Position.child.__name__ == "child"
+
 def test_solve_1():
     position = Position([1])
     assert solve(position, verbose=verbose) == "N"